@@ -0,0 +1,102 @@
+"""Makes the add-on modules importable outside Blender for benchmarking.
+
+Only what the modules touch is stubbed: the classes and property functions
+used at import time, and just enough of `bpy.data` for `import_gs` to build
+a mesh that keeps the uploaded arrays. `mathutils` types exist but can't do
+any math. The add-on package is set up without running its `__init__`, which
+registers classes with Blender.
+"""
+import os
+import sys
+import types
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "fourofour_3d_gen"
+
+
+class _Collection:
+    """Stands in for a bpy_prop_collection, foreach_set copies like Blender does."""
+
+    def __init__(self):
+        self.data = {}
+
+    def add(self, count):
+        self.count = count
+
+    def foreach_set(self, prop, values):
+        self.data[prop] = values.copy()
+
+
+class _Attributes:
+    def __init__(self):
+        self.items = {}
+
+    def new(self, name, type, domain):
+        attribute = self.items[name] = types.SimpleNamespace(data=_Collection())
+        return attribute
+
+
+class _Mesh:
+    def __init__(self, name):
+        self.name = name
+        self.vertices = _Collection()
+        self.attributes = _Attributes()
+
+    def update(self):
+        pass
+
+
+class _Object:
+    def __init__(self, name, mesh):
+        self.name = name
+        self.data = mesh
+        self.modifiers = types.SimpleNamespace(new=lambda name, type: types.SimpleNamespace(name=name))
+
+
+def install():
+    if "bpy" not in sys.modules:
+        bpy = types.ModuleType("bpy")
+        bpy.types = types.ModuleType("bpy.types")
+        bpy.props = types.ModuleType("bpy.props")
+        bpy.utils = types.ModuleType("bpy.utils")
+        for name in ("AddonPreferences", "Context", "UILayout", "Operator", "Panel", "PropertyGroup"):
+            setattr(bpy.types, name, type(name, (), {}))
+        for name in ("BoolProperty", "EnumProperty", "FloatProperty", "IntProperty", "StringProperty", "PointerProperty", "CollectionProperty"):
+            setattr(bpy.props, name, lambda **kwargs: None)
+        bpy.utils.register_classes_factory = lambda classes: (lambda: None, lambda: None)
+        bpy.app = types.ModuleType("bpy.app")
+        bpy.app.handlers = types.ModuleType("bpy.app.handlers")
+        bpy.app.handlers.persistent = lambda handler: handler
+        bpy.app.handlers.depsgraph_update_post = []
+        bpy.app.handlers.load_post = []
+
+        meshes = {}
+        bpy.data = types.SimpleNamespace(
+            meshes=types.SimpleNamespace(new=lambda name: meshes.setdefault(name, _Mesh(name)), remove=lambda mesh: None),
+            objects=types.SimpleNamespace(new=_Object),
+            # Present so ensure_node_group doesn't try to append from the .blend
+            node_groups={"GaussianSplatting": None},
+        )
+        bpy.context = types.SimpleNamespace(
+            collection=types.SimpleNamespace(objects=types.SimpleNamespace(link=lambda obj: None)),
+            view_layer=types.SimpleNamespace(update=lambda: None),
+        )
+        sys.modules.update({
+            "bpy": bpy,
+            "bpy.types": bpy.types,
+            "bpy.props": bpy.props,
+            "bpy.utils": bpy.utils,
+            "bpy.app": bpy.app,
+            "bpy.app.handlers": bpy.app.handlers,
+        })
+
+    if "mathutils" not in sys.modules:
+        mathutils = types.ModuleType("mathutils")
+        for name in ("Matrix", "Vector", "Euler", "Quaternion"):
+            setattr(mathutils, name, type(name, (), {}))
+        sys.modules["mathutils"] = mathutils
+
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [os.path.join(REPO_ROOT, PACKAGE)]
+        sys.modules[PACKAGE] = package
@@ -0,0 +1,165 @@
+"""Throughput of the threaded and asyncio gateway clients against a local stub gateway.
+
+Every job is submitted, polled until its task succeeds and its result is
+downloaded, the way JobManager drives the worker. The stub answers each
+request after `--latency` seconds and finishes a task `--task-time` seconds
+after it was added. Both clients run with the same number of requests in
+flight, `--concurrency`.
+
+    python benchmarks/gateway_clients.py --jobs 200
+"""
+import argparse
+import contextlib
+import io
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import _blender_stub
+
+_blender_stub.install()
+
+from fourofour_3d_gen.gateway.gateway_api import MAX_CONCURRENT_REQUESTS, GatewayApi  # noqa: E402
+from fourofour_3d_gen.gateway.gateway_worker import AsyncGatewayWorker, GatewayMessageKind, GatewayWorker  # noqa: E402
+
+
+class StubGateway(ThreadingHTTPServer):
+    daemon_threads = True
+    # Listen backlog for high --concurrency, the default of 5 resets connections
+    request_queue_size = 1024
+
+    def __init__(self, latency, task_time, result_size):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.latency = latency
+        self.task_time = task_time
+        self.result = bytes(result_size)
+        self.tasks = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        task_id = str(uuid.uuid4())
+        with self.server.lock:
+            self.server.tasks[task_id] = time.monotonic()
+        self._reply(200, json.dumps({"id": task_id}).encode(), "application/json")
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        task_id = parse_qs(url.query).get("id", [""])[0]
+        started = self.server.tasks.get(task_id)
+        if started is None:
+            self._reply(404, b"unknown task")
+        elif url.path == "/get_status":
+            done = time.monotonic() - started >= self.server.task_time
+            body = json.dumps({"status": "Success" if done else "NoResult"}).encode()
+            self._reply(200, body, "application/json")
+        else:
+            self._reply(200, self.server.result, "application/octet-stream", {"Content-Disposition": "attachment; filename=result.spz"})
+
+    def _reply(self, status, body, content_type="text/plain", headers=None):
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def run(worker, gateway, jobs, poll_interval):
+    """Drives `jobs` jobs to completion, returns (seconds, peak number of client threads)."""
+    start = time.perf_counter()
+    for i in range(jobs):
+        worker.submit_text(gateway, f"local-{i}", "a chair", "3DGS", i)
+
+    due = {}
+    done = 0
+    peak_threads = 0
+    while done < jobs:
+        now = time.perf_counter()
+        for message in worker.drain():
+            if message.kind == GatewayMessageKind.SUBMITTED:
+                due[message.payload.id] = now + poll_interval
+            elif message.kind == GatewayMessageKind.STATUS:
+                due[message.job_id] = now + poll_interval
+            elif message.kind == GatewayMessageKind.RESULT:
+                done += 1
+            elif message.kind == GatewayMessageKind.ERROR:
+                raise message.payload
+        for job_id, deadline in list(due.items()):
+            if deadline <= now:
+                del due[job_id]
+                worker.poll(gateway, job_id)
+        client_threads = sum(thread.name.startswith("threegen") for thread in threading.enumerate())
+        peak_threads = max(peak_threads, client_threads)
+        time.sleep(0.005)
+    return time.perf_counter() - start, peak_threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the stub takes per request")
+    parser.add_argument("--task-time", type=float, default=1.0, help="seconds until a task succeeds")
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--result-size", type=int, default=256 * 1024, help="bytes per result")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT_REQUESTS, help="requests in flight, for both clients")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    workers = (
+        ("threads", type("Worker", (GatewayWorker,), {"MAX_WORKERS": args.concurrency})),
+        ("asyncio", type("Worker", (AsyncGatewayWorker,), {"MAX_CONCURRENCY": args.concurrency})),
+    )
+    for name, worker_type in workers:
+        server = StubGateway(args.latency, args.task_time, args.result_size)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        worker = worker_type()
+        try:
+            # The synchronous client prints every request
+            with contextlib.redirect_stdout(io.StringIO()):
+                gateway = GatewayApi(server.url, "benchmark", pool_size=args.concurrency)
+                seconds, peak_threads = run(worker, gateway, args.jobs, args.poll_interval)
+        finally:
+            worker.shutdown()
+            server.shutdown()
+        results.append({
+            "client": name,
+            "concurrency": args.concurrency,
+            "jobs": args.jobs,
+            "seconds": round(seconds, 3),
+            "jobs_per_second": round(args.jobs / seconds, 2),
+            "requests_per_second": round(server.requests / seconds, 2),
+            "peak_client_threads": peak_threads,
+        })
+
+    print(f"{'client':<8} {'jobs':>6} {'seconds':>8} {'jobs/s':>8} {'req/s':>8} {'threads':>8}")
+    for r in results:
+        print(f"{r['client']:<8} {r['jobs']:>6} {r['seconds']:>8} {r['jobs_per_second']:>8} {r['requests_per_second']:>8} {r['peak_client_threads']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Per-stage timings and peak memory of the splat decode/import pipeline, outside Blender.
+
+Every stage runs in a fresh subprocess so its peak RSS isn't inflated by the
+stages before it. Inputs are synthetic PLY/SPZ files (see synthetic.py),
+generated once into `--data-dir`. The report is written as JSON; with
+`--baseline` the times are also compared against an earlier report.
+
+    python benchmarks/pipeline.py --sizes 100000 1000000 --output results.json
+    python benchmarks/pipeline.py --baseline results.json
+"""
+import argparse
+import gc
+import json
+import mmap
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import _blender_stub
+import synthetic
+
+STAGES = (
+    "ply_parse",
+    "ply_chunks",
+    "process_attributes",
+    "spz_decode",
+    "spz_stream_decode",
+    "spz_native_decompress",
+    "import_gs",
+)
+
+
+def _peak_rss_mb():
+    # Kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _prepare(stage, ply_path, spz_path):
+    """Loads the input of `stage` and returns the callable to time, or None if it can't run here."""
+    _blender_stub.install()
+    from fourofour_3d_gen.util import gaussian_splatting, ply, spz
+
+    if stage in ("ply_parse", "ply_chunks"):
+        f = open(ply_path, "rb")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if stage == "ply_parse":
+            def parse():
+                mapped.seek(0)
+                return ply.read_custom_ply(mapped)
+
+            return parse
+
+        def chunks():
+            mapped.seek(0)
+            header = ply.read_ply_header(mapped)
+            for _ in ply.iter_ply_chunks(mapped, header, gaussian_splatting.DEFAULT_CHUNK_SIZE):
+                pass
+
+        return chunks
+
+    if stage == "process_attributes":
+        with open(ply_path, "rb") as f:
+            columns = ply.read_custom_ply(f)
+        return lambda: gaussian_splatting.process_attributes(columns)
+
+    if stage == "import_gs":
+        with open(spz_path, "rb") as f:
+            columns = spz.read_spz(f.read())
+        return lambda: gaussian_splatting.import_gs(columns, "benchmark")
+
+    with open(spz_path, "rb") as f:
+        data = f.read()
+
+    if stage == "spz_decode":
+        return lambda: spz.read_spz(data)
+
+    if stage == "spz_stream_decode":
+        def stream():
+            decoder = spz.SpzStreamDecoder()
+            view = memoryview(data)
+            for start in range(0, len(data), 256 * 1024):
+                decoder.feed(view[start:start + 256 * 1024])
+            return decoder.finish()
+
+        return stream
+
+    if stage == "spz_native_decompress":
+        from fourofour_3d_gen.spz_loader import SPZLoader
+
+        try:
+            loader = SPZLoader()
+        except (OSError, FileNotFoundError, RuntimeError):
+            return None
+        return lambda: loader.decompress(data)
+
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def run_stage(stage, ply_path, spz_path, repeat):
+    """Runs in the child process, prints the result of one stage as JSON."""
+    run = _prepare(stage, ply_path, spz_path)
+    if run is None:
+        print(json.dumps({"skipped": True}))
+        return
+
+    gc.collect()
+    setup_rss = _peak_rss_mb()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+        del result
+    print(json.dumps({
+        "seconds": min(times),
+        "mean_seconds": sum(times) / len(times),
+        "setup_rss_mb": round(setup_rss, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }))
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {(r["stage"], r["splats"]): r for r in json.load(f)["results"] if "seconds" in r}
+
+    regressions = 0
+    print(f"\n{'stage':<24} {'splats':>9} {'baseline':>9} {'now':>9} {'change':>8}")
+    for r in results:
+        before = baseline.get((r["stage"], r["splats"]))
+        if before is None or "seconds" not in r:
+            continue
+        change = r["seconds"] / before["seconds"] - 1.0
+        flag = "  <- slower" if change > threshold else ""
+        regressions += bool(flag)
+        print(f"{r['stage']:<24} {r['splats']:>9} {before['seconds']:>9.4f} {r['seconds']:>9.4f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--sh-degree", type=int, choices=sorted(synthetic.SH_COEFFS), default=0, help="higher order SH in the PLY files")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the fastest is reported")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "threegen-benchmark"))
+    parser.add_argument("--output", default="pipeline_results.json")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown flagged as a regression")
+    parser.add_argument("--stage", help=argparse.SUPPRESS)
+    parser.add_argument("--ply", help=argparse.SUPPRESS)
+    parser.add_argument("--spz", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        run_stage(args.stage, args.ply, args.spz, args.repeat)
+        return
+
+    results = []
+    print(f"{'stage':<24} {'splats':>9} {'seconds':>9} {'peak RSS':>10}")
+    for size in args.sizes:
+        ply_path, spz_path = synthetic.ensure_files(args.data_dir, size, args.sh_degree)
+        for stage in args.stages:
+            child = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--stage", stage, "--ply", ply_path, "--spz", spz_path, "--repeat", str(args.repeat)],
+                capture_output=True,
+                text=True,
+            )
+            result = {"stage": stage, "splats": size}
+            if child.returncode != 0:
+                result["error"] = child.stderr.strip().splitlines()[-1] if child.stderr.strip() else f"exit code {child.returncode}"
+                print(f"{stage:<24} {size:>9} failed: {result['error']}")
+            else:
+                result.update(json.loads(child.stdout.strip().splitlines()[-1]))
+                if result.get("skipped"):
+                    print(f"{stage:<24} {size:>9} skipped")
+                else:
+                    print(f"{stage:<24} {size:>9} {result['seconds']:>9.4f} {result['peak_rss_mb']:>7.1f} MB")
+            results.append(result)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "sh_degree": args.sh_degree,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+    if args.baseline and compare(results, args.baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Synthetic 3DGS splat files for benchmarking.
+
+Writes binary little endian PLY files with the vertex layout 3DGS training
+produces, and SPZ (version 3) files packed the way the reference
+implementation packs them, from the same random splats.
+
+    python benchmarks/synthetic.py --count 1000000 --output-dir /tmp/splats
+"""
+import argparse
+import gzip
+import math
+import os
+import struct
+
+import numpy as np
+
+SPZ_MAGIC = 0x5053474E
+SPZ_FRACTIONAL_BITS = 12
+SH_COEFFS = {0: 0, 1: 3, 2: 8, 3: 15}
+
+
+def random_splats(count, seed=0):
+    """Column dict like `read_custom_ply` returns, with plausible value ranges."""
+    rng = np.random.default_rng(seed)
+    rot = rng.normal(size=(count, 4)).astype(np.float32)
+    rot /= np.linalg.norm(rot, axis=1, keepdims=True)
+    return {
+        "xyz": rng.normal(scale=2.0, size=count * 3).astype(np.float32),
+        "f_dc": rng.normal(scale=1.0, size=count * 3).astype(np.float32),
+        "opacity": rng.normal(scale=2.0, size=count).astype(np.float32),
+        "scale": rng.uniform(-7.0, -2.0, size=count * 3).astype(np.float32),
+        "rot": rot.reshape(-1),
+        "count": count,
+    }
+
+
+def write_ply(path, splats, sh_degree=0):
+    """Writes `splats` as a 3DGS PLY, with normals and zeroed higher order SH like trainers write them."""
+    count = splats["count"]
+    names = ["x", "y", "z", "nx", "ny", "nz", "f_dc_0", "f_dc_1", "f_dc_2"]
+    names += [f"f_rest_{i}" for i in range(SH_COEFFS[sh_degree] * 3)]
+    names += ["opacity", "scale_0", "scale_1", "scale_2", "rot_0", "rot_1", "rot_2", "rot_3"]
+
+    vertices = np.zeros(count, dtype=[(name, "<f4") for name in names])
+    for column, fields in (
+        ("xyz", ("x", "y", "z")),
+        ("f_dc", ("f_dc_0", "f_dc_1", "f_dc_2")),
+        ("opacity", ("opacity",)),
+        ("scale", ("scale_0", "scale_1", "scale_2")),
+        ("rot", ("rot_0", "rot_1", "rot_2", "rot_3")),
+    ):
+        values = splats[column].reshape(count, len(fields))
+        for i, field in enumerate(fields):
+            vertices[field] = values[:, i]
+
+    header = ["ply", "format binary_little_endian 1.0", f"element vertex {count}"]
+    header += [f"property float {name}" for name in names]
+    header += ["end_header"]
+    with open(path, "wb") as f:
+        f.write(("\n".join(header) + "\n").encode("ascii"))
+        vertices.tofile(f)
+
+
+def pack_spz(splats):
+    """Gzipped SPZ version 3 payload of `splats`, without higher order SH."""
+    count = splats["count"]
+
+    fixed = np.round(splats["xyz"].astype(np.float64) * (1 << SPZ_FRACTIONAL_BITS)).astype(np.int32)
+    positions = np.stack([(fixed >> shift) & 0xFF for shift in (0, 8, 16)], axis=-1).astype(np.uint8)
+
+    alphas = np.round(255.0 / (1.0 + np.exp(-splats["opacity"]))).astype(np.uint8)
+    colors = np.clip(np.round((splats["f_dc"] * 0.15 + 0.5) * 255.0), 0, 255).astype(np.uint8)
+    scales = np.clip(np.round((splats["scale"] + 10.0) * 16.0), 0, 255).astype(np.uint8)
+    rotations = _pack_rotations_smallest_three(splats["rot"].reshape(count, 4))
+
+    header = struct.pack("<IIIBBBB", SPZ_MAGIC, 3, count, 0, SPZ_FRACTIONAL_BITS, 0, 0)
+    body = b"".join(a.tobytes() for a in (positions, alphas, colors, scales, rotations))
+    return gzip.compress(header + body, compresslevel=6)
+
+
+def _pack_rotations_smallest_three(wxyz):
+    q = wxyz[:, [1, 2, 3, 0]].astype(np.float64)  # x,y,z,w
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    largest = np.argmax(np.abs(q), axis=1)
+    rows = np.arange(len(q))
+    q[q[rows, largest] < 0] *= -1.0
+
+    comp = largest.astype(np.uint32)
+    for i in range(4):
+        magnitude = np.clip(np.round(np.abs(q[:, i]) / math.sqrt(0.5) * 511), 0, 511).astype(np.uint32)
+        negative = (q[:, i] < 0).astype(np.uint32)
+        comp = np.where(largest == i, comp, (comp << 10) | (negative << 9) | magnitude)
+    return comp.astype("<u4").view(np.uint8)
+
+
+def write_spz(path, splats):
+    with open(path, "wb") as f:
+        f.write(pack_spz(splats))
+
+
+def ensure_files(directory, count, sh_degree=0):
+    """Paths of the synthetic PLY and SPZ with `count` splats, generated if missing."""
+    os.makedirs(directory, exist_ok=True)
+    ply_path = os.path.join(directory, f"splats_{count}_sh{sh_degree}.ply")
+    spz_path = os.path.join(directory, f"splats_{count}.spz")
+    if not os.path.exists(ply_path) or not os.path.exists(spz_path):
+        splats = random_splats(count)
+        if not os.path.exists(ply_path):
+            write_ply(ply_path, splats, sh_degree)
+        if not os.path.exists(spz_path):
+            write_spz(spz_path, splats)
+    return ply_path, spz_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--sh-degree", type=int, choices=sorted(SH_COEFFS), default=0)
+    parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args()
+
+    for count in args.count:
+        for path in ensure_files(args.output_dir, count, args.sh_degree):
+            print(f"{path}: {os.path.getsize(path) / 2**20:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ ABI="cp311"
 
 PACKAGES=(
   "pydantic==2.11.7"
+  "aiohttp==3.14.5"
 )
 
 for pkg in "${PACKAGES[@]}"; do
@@ -5,6 +5,9 @@ from . import preferences
 from . import ops, ui, props
 from .spz_updater import SPZUpdater
 from .spz_loader import init_spz
+from .gateway.gateway_api import get_gateway
+from .gateway.gateway_worker import get_worker
+from .util import spatial
 
 
 modules = [
@@ -15,19 +18,33 @@ modules = [
 ]
 
 def register():
-    if SPZUpdater.need_update():
-        SPZUpdater.update()
-
     for m in modules:
         m.register()
+    spatial.register()
+
+    try:
+        prefs = preferences.get_preferences()
+        use_native_spz = prefs.spz_decoder != "BUILTIN"
+        if prefs.warm_up_connection:
+            # Through the worker of the selected client, whose connections the requests reuse
+            get_worker().warm_up(get_gateway())
+    except KeyError:
+        use_native_spz = True
+
+    if not use_native_spz:
+        return
+
+    if SPZUpdater.need_update():
+        SPZUpdater.update()
 
     try:
         pkg_dir = Path(__file__).resolve().parent
         print(f"Initializing SPZ with library path: {pkg_dir}")
         init_spz(str(pkg_dir))
     except Exception as e:
-        print(f"SPZ initialization failed: {e}")   
+        print(f"SPZ initialization failed: {e}")
     
 def unregister():
+    spatial.unregister()
     for m in reversed(modules):
         m.unregister()
@@ -0,0 +1,118 @@
+import csv
+import os
+import time
+from collections import deque
+from typing import Callable, NamedTuple
+
+from .gateway.gateway_rate_limiter import TokenBucket
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".tga", ".exr", ".webp"}
+OBJECT_TYPES = {"3DGS": "3DGS", "GS": "3DGS", "SPLAT": "3DGS", "MESH": "MESH"}
+
+
+class BatchItem(NamedTuple):
+    prompt: str
+    image_path: str
+    obj_type: str
+    seed: int
+
+
+def read_batch_file(path: str, obj_type: str = "3DGS", seed: int = -1) -> list[BatchItem]:
+    """Reads the prompts or image paths of a batch, one per line of a text file or row of a CSV file.
+
+    Lines of a text file ending in an image extension are image paths. CSV files
+    need a header naming their columns: `prompt` and/or `image`, optionally
+    `obj_type` and `seed` overriding the defaults per row. Relative image paths
+    are resolved against the folder of the file. Raises ValueError naming the
+    offending line.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    items = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if path.lower().endswith(".csv"):
+            reader = csv.DictReader(f)
+            columns = {name.strip().lower() for name in reader.fieldnames or ()}
+            if not columns & {"prompt", "image"}:
+                raise ValueError(f"{path}: the CSV header needs a 'prompt' or 'image' column")
+            rows = (
+                (reader.line_num, {k.strip().lower(): (v or "").strip() for k, v in row.items() if k})
+                for row in reader
+            )
+        else:
+            rows = (
+                (line_num, {"image" if os.path.splitext(line)[1].lower() in IMAGE_EXTENSIONS else "prompt": line})
+                for line_num, line in enumerate((line.strip() for line in f), 1)
+                if line and not line.startswith("#")
+            )
+
+        for line_num, row in rows:
+            prompt, image = row.get("prompt", ""), row.get("image", "")
+            if not prompt and not image:
+                continue
+            if image:
+                image = os.path.normpath(os.path.join(folder, os.path.expanduser(image)))
+
+            row_type = OBJECT_TYPES.get(row["obj_type"].upper()) if row.get("obj_type") else obj_type
+            if row_type is None:
+                raise ValueError(f"{path}:{line_num}: unknown obj_type '{row['obj_type']}'")
+            if row_type == "MESH" and not image:
+                raise ValueError(f"{path}:{line_num}: meshes can only be generated from images")
+
+            try:
+                row_seed = int(row["seed"]) if row.get("seed") else seed
+            except ValueError:
+                raise ValueError(f"{path}:{line_num}: seed '{row['seed']}' is not a number") from None
+
+            items.append(BatchItem(prompt, image, row_type, row_seed))
+    return items
+
+
+class BatchQueue:
+    """Items of a batch waiting to be submitted, released by a token bucket.
+
+    Also keeps the figures for the throughput and ETA shown in the UI.
+    """
+
+    def __init__(self, items: list[BatchItem], max_in_flight: int, per_minute: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._items = deque(items)
+        # Jobs rejected with 429, resubmitted before new items
+        self._retries: deque[str] = deque()
+        self.max_in_flight = max_in_flight
+        self.bucket = TokenBucket(per_minute / 60.0, max(1.0, min(max_in_flight, per_minute / 60.0)), clock)
+        self.total = len(items)
+        self.completed = 0
+        self.started = clock()
+
+    def has_pending(self) -> bool:
+        return bool(self._items or self._retries)
+
+    def pop_retry(self) -> str | None:
+        return self._retries.popleft() if self._retries else None
+
+    def pop_item(self) -> BatchItem | None:
+        return self._items.popleft() if self._items else None
+
+    def rate_limited(self, job_id: str, retry_after: float) -> None:
+        """Submitting `job_id` was rejected with 429, resubmit it once the bucket allows."""
+        self.bucket.rate_limited(retry_after)
+        self._retries.append(job_id)
+
+    def cancel(self) -> list[str]:
+        """Drops everything not submitted yet, returns the jobs that were waiting to be resubmitted."""
+        retries = list(self._retries)
+        self.total -= len(self._items)
+        self._items.clear()
+        self._retries.clear()
+        return retries
+
+    def jobs_per_minute(self) -> float:
+        elapsed = self._clock() - self.started
+        return self.completed / elapsed * 60.0 if elapsed > 0 else 0.0
+
+    def eta(self, failed: int) -> float | None:
+        """Seconds until the remaining items are done at the throughput so far, None before the first result."""
+        if self.completed == 0:
+            return None
+        remaining = max(self.total - self.completed - failed, 0)
+        return remaining / self.jobs_per_minute() * 60.0
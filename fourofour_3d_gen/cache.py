@@ -0,0 +1,27 @@
+import bpy
+
+from .preferences import get_preferences
+from .util.disk_cache import DiskCache
+
+_result_cache: DiskCache | None = None
+_import_cache: DiskCache | None = None
+
+
+def get_result_cache() -> DiskCache:
+    """Returns the on-disk cache of generated assets, sized from the preferences."""
+    global _result_cache
+    if _result_cache is None:
+        directory = bpy.utils.extension_path_user(__package__, path="result_cache", create=True)
+        _result_cache = DiskCache(directory, 0)
+    _result_cache.max_bytes = get_preferences().result_cache_size * 1024 * 1024
+    return _result_cache
+
+
+def get_import_cache() -> DiskCache:
+    """Returns the on-disk cache of processed attributes of imported files, sized from the preferences."""
+    global _import_cache
+    if _import_cache is None:
+        directory = bpy.utils.extension_path_user(__package__, path="import_cache", create=True)
+        _import_cache = DiskCache(directory, 0)
+    _import_cache.max_bytes = get_preferences().import_cache_size * 1024 * 1024
+    return _import_cache
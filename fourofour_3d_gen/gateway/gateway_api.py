@@ -1,15 +1,23 @@
-import bpy
-import os
 import requests
-import tempfile
-from typing import Any, cast
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Mapping
 from urllib.parse import urlencode
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ..preferences import get_preferences
 from .gateway_routes import GatewayRoutes
 from .gateway_task import GatewayTask, GatewayTaskStatusResponse
 
 
 class GatewayErrorBase(Exception):
-    pass
+    def __init__(self, *args: Any, retry_after: float | None = None) -> None:
+        super().__init__(*args)
+        # Seconds the gateway asked to wait before retrying, if it was rate limited
+        self.retry_after = retry_after
 
 
 class GatewayAddTaskError(GatewayErrorBase):
@@ -28,67 +36,121 @@ class GatewayNoAttachmentError(GatewayErrorBase):
     pass
 
 
+class HttpStatusError(Exception):
+    """Error status of a response received by a client not built on requests."""
+
+    def __init__(self, status_code: int, reason: str, headers: Mapping[str, str]) -> None:
+        super().__init__(f"{status_code} {reason}")
+        self.status_code = status_code
+        self.headers = headers
+
+
+# Requests the gateway worker runs at the same time, the connection pool is sized to match
+MAX_CONCURRENT_REQUESTS = 4
+
+
 class GatewayApi:
     """API client for interacting with gateway."""
 
     GATEWAY_TASK_TIMEOUT_SEC: int = 10 * 60
+    RESULT_CHUNK_SIZE: int = 256 * 1024
 
-    def __init__(self, gateway_url: str, gateway_api_key: str) -> None:
-        self._http_client = requests.Session()
+    def __init__(
+        self,
+        gateway_url: str,
+        gateway_api_key: str,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        retries: int = 3,
+        pool_size: int = MAX_CONCURRENT_REQUESTS,
+    ) -> None:
         self._gateway_url = gateway_url
         self._gateway_api_key = gateway_api_key
+        self._timeout = (connect_timeout, read_timeout)
+        self._retries = retries
+
+        # Connection errors, and 500/502/504 of idempotent requests, are retried with backoff here.
+        # 429 and 503 never are: sleeping out a Retry-After would hold a worker thread, so they are
+        # raised with it right away and the poll scheduler or the batch token bucket waits instead.
+        retry = Retry(
+            total=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 504),
+            respect_retry_after_header=False,
+            raise_on_status=False,
+        )
+        # requests.Session isn't thread-safe (cookies, adapter state), so every thread gets its own.
+        # They all mount this adapter, whose urllib3 pool is, so connections (and the warm-up one) are shared.
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self._sessions = threading.local()
+
+    @property
+    def _http_client(self) -> requests.Session:
+        """Session of the calling thread."""
+        session = getattr(self._sessions, "session", None)
+        if session is None:
+            session = self._sessions.session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+        return session
 
-    def _format_add_task_error(self, error: Exception) -> str:
-        if isinstance(error, requests.HTTPError):
-            response = error.response
-            if response is not None and response.status_code == 429:
-                return "Gateway: too many requests. Please retry later."
+    def warm_up(self) -> None:
+        """Opens a pooled connection to the gateway ahead of the first request."""
+        try:
+            self._http_client.head(self._gateway_url, timeout=self._timeout)
+        except requests.RequestException as e:
+            print(f"Gateway: warm-up failed: {e}")
+
+    def close(self) -> None:
+        """Closes the pooled connections of every thread's session."""
+        self._adapter.close()
+
+    @staticmethod
+    def model_for(obj_type: str) -> str:
+        """Gateway model generating `obj_type` objects."""
+        return "404-3dgs" if obj_type == "3DGS" else "404-mesh"
+
+    @staticmethod
+    def _format_add_task_error(error: Exception) -> str:
+        status = _error_status(error)
+        if status is not None and status[0] == 429:
+            return "Gateway: too many requests. Please retry later."
         return f"Gateway: error to add task: {error}"
 
     def add_text_task(self, text_prompt: str, obj_type:str, seed:int) -> GatewayTask:
         """Adds a text task to the gateway."""
         try:
             url = self._construct_url(host=self._gateway_url, route=GatewayRoutes.ADD_TASK)
-            model = "404-3dgs" if obj_type == "3DGS" else "404-mesh"
+            model = self.model_for(obj_type)
             print(text_prompt)
             payload = {"prompt": text_prompt, "model": model, "seed": seed}
             headers = {"x-api-key": self._gateway_api_key, "x-client-origin": "blender" }
-            response = self._http_client.post(url=url, json=payload, headers=headers)
+            response = self._http_client.post(url=url, json=payload, headers=headers, timeout=self._timeout)
             response.raise_for_status()
             return GatewayTask.model_validate_json(response.text)
         except Exception as e:
-            raise GatewayAddTaskError(self._format_add_task_error(e)) from e
+            raise GatewayAddTaskError(self._format_add_task_error(e), retry_after=_retry_after(e)) from e
         
-    def add_image_task(self, image, obj_type:str, seed:int) -> GatewayTask:
-        """Adds a image task to the gateway."""
-
-        url = self._construct_url(host=self._gateway_url, route=GatewayRoutes.ADD_TASK)
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-            temp_path = tmp.name
-
+    def add_image_task(self, image_data: bytes, obj_type:str, seed:int, content_type: str = "image/png", filename: str = "image.png") -> GatewayTask:
+        """Adds a image task to the gateway from encoded `image_data`."""
         try:
-            image.save_render(temp_path)
-            with open(temp_path, "rb") as f:
-                files = {"image": (os.path.basename(temp_path), f, "image/png")}
-                model = "404-3dgs" if obj_type == "3DGS" else "404-mesh"
-                headers = {"x-api-key": self._gateway_api_key, "x-client-origin": "blender" }
-                response = self._http_client.post(
-                    url=url,
-                    files=files,
-                    data={"model": model, "seed": seed},
-                    headers=headers
-                )
-                response.raise_for_status()
-                return GatewayTask.model_validate_json(response.text)
-            
+            url = self._construct_url(host=self._gateway_url, route=GatewayRoutes.ADD_TASK)
+            files = {"image": (filename, image_data, content_type)}
+            model = self.model_for(obj_type)
+            headers = {"x-api-key": self._gateway_api_key, "x-client-origin": "blender" }
+            response = self._http_client.post(
+                url=url,
+                files=files,
+                data={"model": model, "seed": seed},
+                headers=headers,
+                timeout=self._timeout,
+            )
+            response.raise_for_status()
+            return GatewayTask.model_validate_json(response.text)
         except Exception as e:
-            raise GatewayAddTaskError(self._format_add_task_error(e)) from e
-        
-        finally:
-            try:
-                os.remove(temp_path)
-            except OSError:
-                pass
+            raise GatewayAddTaskError(self._format_add_task_error(e), retry_after=_retry_after(e)) from e
 
 
     def get_status(self, task_id:str) -> GatewayTaskStatusResponse:
@@ -96,27 +158,50 @@ class GatewayApi:
         try:
             url = self._construct_url(host=self._gateway_url, route=GatewayRoutes.GET_STATUS, id=task_id)
             headers = {"x-api-key": self._gateway_api_key}
-            response = self._http_client.get(url=url, headers=headers)
+            response = self._http_client.get(url=url, headers=headers, timeout=self._timeout)
             response.raise_for_status()
             print(response.text)
             return GatewayTaskStatusResponse.model_validate_json(response.text)
         except Exception as e:
-            raise GatewayGetStatusError(f"Gateway: error to get status: {e}") from e
+            raise GatewayGetStatusError(f"Gateway: error to get status: {e}", retry_after=_retry_after(e)) from e
 
 
     def get_result(self, task_id: str) -> bytes:
         """Gets generated 3D asset in spz format."""
+        data = bytearray()
+        self.stream_result(task_id, data.extend)
+        return bytes(data)
+
+    def stream_result(
+        self,
+        task_id: str,
+        on_chunk: Callable[[bytes], None],
+        on_progress: Callable[[int, int | None], None] | None = None,
+    ) -> None:
+        """Downloads the generated 3D asset, passing it to `on_chunk` piece by piece as it arrives.
+
+        `on_progress` gets the bytes received so far and the total size, which is
+        None when the gateway doesn't send a Content-Length.
+        """
         try:
             url = self._construct_url(host=self._gateway_url, route=GatewayRoutes.GET_RESULT, id=task_id)
             headers = {"x-api-key": self._gateway_api_key}
-            response = self._http_client.get(url=url, headers=headers)
-            response.raise_for_status()
-            if response.headers.get('content-disposition', '').startswith('attachment'):
-                return cast(bytes, response.content)
-            raise GatewayNoAttachmentError()
+            with self._http_client.get(url=url, headers=headers, stream=True, timeout=self._timeout) as response:
+                response.raise_for_status()
+                if not response.headers.get('content-disposition', '').startswith('attachment'):
+                    raise GatewayNoAttachmentError()
+
+                length = response.headers.get('content-length', '')
+                total = int(length) if length.isdigit() else None
+                received = 0
+                for chunk in response.iter_content(chunk_size=self.RESULT_CHUNK_SIZE):
+                    on_chunk(chunk)
+                    received += len(chunk)
+                    if on_progress is not None:
+                        on_progress(received, total)
         except Exception as e:
             raise GatewayGetResultError(f"Gateway: error to get result: {e}") from e
-        
+
     def get_timeout(self):
         return self.GATEWAY_TASK_TIMEOUT_SEC
 
@@ -126,16 +211,51 @@ class GatewayApi:
             return f"{host}{route.value}?{query}"
         return f"{host}{route.value}"
 
+def _error_status(error: Exception) -> tuple[int, Mapping[str, str]] | None:
+    """Status code and headers of the response an HTTP error was raised for."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code, error.response.headers
+    if isinstance(error, HttpStatusError):
+        return error.status_code, error.headers
+    return None
+
+
+def _retry_after(error: Exception) -> float | None:
+    """Returns the wait requested by a 429/503 response, defaulting to 0 when no Retry-After is sent."""
+    status = _error_status(error)
+    if status is None:
+        return None
+    return retry_after_seconds(*status)
+
+
+def retry_after_seconds(status_code: int, headers: Mapping[str, str]) -> float | None:
+    """Parses the Retry-After of a 429/503 response, None for other statuses."""
+    if status_code not in (429, 503):
+        return None
+
+    value = headers.get("Retry-After", "")
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
 _gateway_instance = None
 
 
+_gateway_settings = None
+
+
 def get_gateway():
-    global _gateway_instance
-    prefs = bpy.context.preferences.addons["bl_ext.user_default.fourofour_3d_gen"].preferences
-    if (
-        _gateway_instance is None
-        or _gateway_instance._gateway_url != prefs.url
-        or _gateway_instance._gateway_api_key != prefs.token
-    ):
-        _gateway_instance = GatewayApi(prefs.url, prefs.token)
+    global _gateway_instance, _gateway_settings
+    prefs = get_preferences()
+    settings = (prefs.url, prefs.token, prefs.connect_timeout, prefs.read_timeout, prefs.request_retries)
+    if _gateway_instance is None or _gateway_settings != settings:
+        _gateway_instance = GatewayApi(*settings)
+        _gateway_settings = settings
     return _gateway_instance
+
@@ -0,0 +1,208 @@
+import asyncio
+import ssl
+from typing import Any, Awaitable, Callable
+from urllib.parse import urlencode
+
+import aiohttp
+import certifi
+
+from .gateway_api import (
+    GatewayAddTaskError,
+    GatewayApi,
+    GatewayGetResultError,
+    GatewayGetStatusError,
+    GatewayNoAttachmentError,
+    HttpStatusError,
+    _retry_after,
+)
+from .gateway_routes import GatewayRoutes
+from .gateway_task import GatewayTask, GatewayTaskStatusResponse
+
+
+class AsyncGatewayApi:
+    """asyncio counterpart of GatewayApi, with the same add/status/result surface.
+
+    Requests are non-blocking aiohttp requests on the calling event loop, and a
+    semaphore bounds how many are in flight at once to `max_concurrency`, so
+    one loop thread drives any number of outstanding tasks. TLS is verified
+    against certifi like requests does, and proxies are taken from the
+    environment. Retries follow GatewayApi's transport: connection errors, and
+    500/502/504 of idempotent requests, are retried with backoff, while 429 and
+    503 are raised right away with their Retry-After.
+
+    Must be used, and closed, on one event loop.
+    """
+
+    BACKOFF_FACTOR: float = 0.5
+
+    def __init__(
+        self,
+        gateway_url: str,
+        gateway_api_key: str,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        retries: int = 3,
+        max_concurrency: int = 64,
+    ) -> None:
+        self._gateway_url = gateway_url
+        self._gateway_api_key = gateway_api_key
+        self._timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+        self._retries = retries
+        self._max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Created on first use, a ClientSession must be made on the loop it runs on
+        self._session: aiohttp.ClientSession | None = None
+
+    @classmethod
+    def from_gateway(cls, gateway: GatewayApi, max_concurrency: int = 64) -> "AsyncGatewayApi":
+        """Async client with the URL, key and transport settings of `gateway`."""
+        connect_timeout, read_timeout = gateway._timeout
+        return cls(gateway._gateway_url, gateway._gateway_api_key, connect_timeout, read_timeout, gateway._retries, max_concurrency)
+
+    async def warm_up(self) -> None:
+        """Opens a pooled connection to the gateway ahead of the first request."""
+        try:
+            async with self._semaphore:
+                async with self._get_session().head(self._gateway_url):
+                    pass
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Gateway: warm-up failed: {e}")
+
+    async def add_text_task(self, text_prompt: str, obj_type: str, seed: int) -> GatewayTask:
+        """Adds a text task to the gateway."""
+        try:
+            url = self._construct_url(GatewayRoutes.ADD_TASK)
+            payload = {"prompt": text_prompt, "model": GatewayApi.model_for(obj_type), "seed": seed}
+            headers = {"x-api-key": self._gateway_api_key, "x-client-origin": "blender"}
+            async with self._semaphore:
+                async with await self._send("POST", url, headers, json=payload) as response:
+                    return GatewayTask.model_validate_json(await response.text())
+        except Exception as e:
+            raise GatewayAddTaskError(GatewayApi._format_add_task_error(e), retry_after=_retry_after(e)) from e
+
+    async def add_image_task(self, image_data: bytes, obj_type: str, seed: int, content_type: str = "image/png", filename: str = "image.png") -> GatewayTask:
+        """Adds a image task to the gateway from encoded `image_data`."""
+
+        def form():
+            data = aiohttp.FormData()
+            data.add_field("model", GatewayApi.model_for(obj_type))
+            data.add_field("seed", str(seed))
+            data.add_field("image", image_data, filename=filename, content_type=content_type)
+            return data
+
+        try:
+            url = self._construct_url(GatewayRoutes.ADD_TASK)
+            headers = {"x-api-key": self._gateway_api_key, "x-client-origin": "blender"}
+            async with self._semaphore:
+                async with await self._send("POST", url, headers, form=form) as response:
+                    return GatewayTask.model_validate_json(await response.text())
+        except Exception as e:
+            raise GatewayAddTaskError(GatewayApi._format_add_task_error(e), retry_after=_retry_after(e)) from e
+
+    async def get_status(self, task_id: str) -> GatewayTaskStatusResponse:
+        """Gets the status of a task."""
+        try:
+            url = self._construct_url(GatewayRoutes.GET_STATUS, id=task_id)
+            async with self._semaphore:
+                async with await self._send("GET", url, {"x-api-key": self._gateway_api_key}) as response:
+                    return GatewayTaskStatusResponse.model_validate_json(await response.text())
+        except Exception as e:
+            raise GatewayGetStatusError(f"Gateway: error to get status: {e}", retry_after=_retry_after(e)) from e
+
+    async def get_result(self, task_id: str) -> bytes:
+        """Gets generated 3D asset in spz format."""
+        data = bytearray()
+
+        async def on_chunk(chunk):
+            data.extend(chunk)
+
+        await self.stream_result(task_id, on_chunk)
+        return bytes(data)
+
+    async def stream_result(
+        self,
+        task_id: str,
+        on_chunk: Callable[[bytes], Awaitable[None]],
+        on_progress: Callable[[int, int | None], None] | None = None,
+    ) -> None:
+        """Downloads the generated 3D asset, see `GatewayApi.stream_result`.
+
+        `on_chunk` is a coroutine function, awaited for every chunk before the
+        next one is read, so a slow consumer holds the download back rather
+        than buffering it. `on_progress` is called on the loop.
+        """
+        try:
+            url = self._construct_url(GatewayRoutes.GET_RESULT, id=task_id)
+            async with self._semaphore:
+                async with await self._send("GET", url, {"x-api-key": self._gateway_api_key}) as response:
+                    if not response.headers.get("content-disposition", "").startswith("attachment"):
+                        raise GatewayNoAttachmentError()
+
+                    length = response.headers.get("content-length", "")
+                    total = int(length) if length.isdigit() else None
+                    received = 0
+                    async for chunk in response.content.iter_chunked(GatewayApi.RESULT_CHUNK_SIZE):
+                        await on_chunk(chunk)
+                        received += len(chunk)
+                        if on_progress is not None:
+                            on_progress(received, total)
+        except Exception as e:
+            raise GatewayGetResultError(f"Gateway: error to get result: {e}") from e
+
+    def get_timeout(self):
+        return GatewayApi.GATEWAY_TASK_TIMEOUT_SEC
+
+    async def close(self) -> None:
+        """Closes the pooled connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self._max_concurrency,
+                ssl=ssl.create_default_context(cafile=certifi.where()),
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self._timeout, trust_env=True)
+        return self._session
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str] | None = None,
+        json: Any = None,
+        form: Callable[[], aiohttp.FormData] | None = None,
+    ) -> aiohttp.ClientResponse:
+        """Sends a request with the retries of GatewayApi's transport, raising HttpStatusError for error statuses.
+
+        `form` builds the multipart body again for every attempt.
+        """
+        idempotent = method != "POST"
+        for attempt in range(self._retries + 1):
+            retry = attempt < self._retries
+            try:
+                response = await self._get_session().request(
+                    method, url, headers=headers, json=json, data=form() if form is not None else None,
+                )
+            except aiohttp.ClientConnectorError:
+                # The request never reached the gateway, safe to send again whatever the method
+                if not retry:
+                    raise
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if not (retry and idempotent):
+                    raise
+            else:
+                if response.status < 400:
+                    return response
+                response.release()
+                if not (retry and idempotent and response.status in (500, 502, 504)):
+                    raise HttpStatusError(response.status, response.reason or "", response.headers)
+            await asyncio.sleep(self.BACKOFF_FACTOR * 2**attempt)
+
+    def _construct_url(self, route: GatewayRoutes, **kwargs: Any) -> str:
+        query = urlencode(kwargs)
+        if query:
+            return f"{self._gateway_url}{route.value}?{query}"
+        return f"{self._gateway_url}{route.value}"
@@ -0,0 +1,58 @@
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """Paces task submissions to `rate` per second, in bursts of up to `capacity`.
+
+    A 429 from the gateway empties the bucket, pauses it for the Retry-After and
+    halves the rate. Every accepted submission then recovers RECOVERY of the
+    configured rate, so the pace settles just below what the gateway accepts.
+    """
+
+    RECOVERY: float = 0.1
+    MIN_RATE: float = 0.05  # of the configured rate
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+
+    def try_acquire(self) -> bool:
+        """Takes a token if one is available."""
+        now = self._refill()
+        if now < self._paused_until or self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+    def delay(self) -> float:
+        """Seconds until the next token is available."""
+        now = self._refill()
+        if now < self._paused_until:
+            return self._paused_until - now + max(1.0 - self._tokens, 0.0) / self.rate
+        return max(1.0 - self._tokens, 0.0) / self.rate
+
+    def accepted(self) -> None:
+        """A submission was accepted by the gateway."""
+        self.rate = min(self.rate + self.max_rate * self.RECOVERY, self.max_rate)
+
+    def rate_limited(self, retry_after: float) -> None:
+        """The gateway answered 429, asking to wait `retry_after` seconds."""
+        now = self._refill()
+        self._tokens = 0.0
+        self._paused_until = max(self._paused_until, now + retry_after)
+        self.rate = max(self.rate * 0.5, self.max_rate * self.MIN_RATE)
+
+    def _refill(self) -> float:
+        now = self._clock()
+        # Nothing accrues while paused
+        start = max(self._updated, self._paused_until)
+        if now > start:
+            self._tokens = min(self._tokens + (now - start) * self.rate, self.capacity)
+        self._updated = now
+        return now
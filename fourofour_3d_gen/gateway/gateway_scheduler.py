@@ -0,0 +1,84 @@
+import heapq
+import itertools
+import random
+import time
+from typing import Callable
+
+
+class PollScheduler:
+    """Keeps a status poll deadline per job in a priority queue.
+
+    A job is polled MIN_INTERVAL after submission. Every poll without progress
+    backs the interval off by BACKOFF up to MAX_INTERVAL, a PartialResult
+    resets it, and a Retry-After from the gateway overrides it. Deadlines are
+    jittered so jobs submitted together don't poll in lockstep.
+    """
+
+    MIN_INTERVAL: float = 2.0
+    MAX_INTERVAL: float = 30.0
+    BACKOFF: float = 1.5
+    JITTER: float = 0.2
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._heap: list[tuple[float, int, str]] = []
+        self._counter = itertools.count()
+        # Current deadline and interval per scheduled job; heap entries not matching are stale
+        self._deadlines: dict[str, float] = {}
+        self._intervals: dict[str, float] = {}
+
+    def schedule(self, job_id: str) -> None:
+        """Schedules the first poll of a newly submitted job."""
+        self._intervals[job_id] = self.MIN_INTERVAL
+        self._push(job_id, self.MIN_INTERVAL)
+
+    def progressed(self, job_id: str) -> None:
+        """The job reported progress, poll again soon."""
+        self._intervals[job_id] = self.MIN_INTERVAL
+        self._push(job_id, self.MIN_INTERVAL)
+
+    def backoff(self, job_id: str) -> None:
+        """The job reported no progress, poll less often."""
+        interval = min(self._intervals.get(job_id, self.MIN_INTERVAL) * self.BACKOFF, self.MAX_INTERVAL)
+        self._intervals[job_id] = interval
+        self._push(job_id, interval)
+
+    def retry_after(self, job_id: str, seconds: float) -> None:
+        """The gateway asked to wait `seconds` before the next request."""
+        self._intervals.setdefault(job_id, self.MIN_INTERVAL)
+        self._push(job_id, max(seconds, self.MIN_INTERVAL), jitter=False)
+
+    def remove(self, job_id: str) -> None:
+        self._deadlines.pop(job_id, None)
+        self._intervals.pop(job_id, None)
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._deadlines.clear()
+        self._intervals.clear()
+
+    def pop_due(self) -> list[str]:
+        """Returns the jobs whose deadline passed; they stay unscheduled until rescheduled."""
+        now = self._clock()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, job_id = heapq.heappop(self._heap)
+            if self._deadlines.get(job_id) == deadline:
+                del self._deadlines[job_id]
+                due.append(job_id)
+        return due
+
+    def next_delay(self) -> float | None:
+        """Seconds until the earliest deadline, or None if nothing is scheduled."""
+        while self._heap and self._deadlines.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return max(self._heap[0][0] - self._clock(), 0.0)
+
+    def _push(self, job_id: str, delay: float, jitter: bool = True) -> None:
+        if jitter:
+            delay *= random.uniform(1.0 - self.JITTER, 1.0 + self.JITTER)
+        deadline = self._clock() + delay
+        self._deadlines[job_id] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._counter), job_id))
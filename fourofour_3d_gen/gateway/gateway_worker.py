@@ -0,0 +1,295 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable
+
+from .gateway_api import MAX_CONCURRENT_REQUESTS, GatewayApi
+from .gateway_async import AsyncGatewayApi
+from .gateway_task import GatewayTaskStatus
+from ..preferences import get_preferences
+from ..util.image import EncodedImage
+
+
+class GatewayMessageKind(Enum):
+    """Kind of a message handed back from the worker threads"""
+
+    SUBMITTED = "submitted"
+    """Task was added, payload is the GatewayTask."""
+    STATUS = "status"
+    """Task is not done yet or failed, payload is the GatewayTaskStatusResponse."""
+    PROGRESS = "progress"
+    """Part of the result was downloaded, payload is (bytes received, total bytes or None)."""
+    RESULT = "result"
+    """Task succeeded and its asset was downloaded, payload is what the result decoder returned."""
+    ERROR = "error"
+    """Request raised, payload is the exception."""
+
+
+@dataclass
+class GatewayMessage:
+    job_id: str
+    kind: GatewayMessageKind
+    payload: Any
+
+
+class ResultCollector:
+    """Default result decoder, collects the downloaded asset as bytes."""
+
+    def __init__(self) -> None:
+        self._data = bytearray()
+
+    def feed(self, chunk: bytes) -> None:
+        self._data += chunk
+
+    def finish(self) -> bytes:
+        return bytes(self._data)
+
+
+class GatewayWorker:
+    """Runs gateway requests on a bounded thread pool.
+
+    Requests are queued from Blender's main thread; their outcome comes back as
+    GatewayMessages through `drain`, so only datablock work stays on the main
+    thread. At most one request per job is in flight at a time.
+    """
+
+    MAX_WORKERS: int = MAX_CONCURRENT_REQUESTS
+
+    def __init__(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix="threegen-gateway")
+        self._messages: queue.SimpleQueue[GatewayMessage] = queue.SimpleQueue()
+        # Only touched from the main thread
+        self._busy: set[str] = set()
+
+    def is_busy(self, job_id: str) -> bool:
+        return job_id in self._busy
+
+    def has_pending(self) -> bool:
+        return bool(self._busy)
+
+    def warm_up(self, gateway: GatewayApi) -> None:
+        """Opens a connection to the gateway for the requests that follow, in the background."""
+        self._executor.submit(gateway.warm_up)
+
+    def submit_text(self, gateway: GatewayApi, job_id: str, prompt: str, obj_type: str, seed: int) -> None:
+        def add_task():
+            return GatewayMessageKind.SUBMITTED, gateway.add_text_task(prompt, obj_type, seed)
+
+        self._run(job_id, add_task)
+
+    def submit_image(self, gateway: GatewayApi, job_id: str, image: EncodedImage, obj_type: str, seed: int) -> None:
+        def add_task():
+            task = gateway.add_image_task(image.data, obj_type, seed, image.content_type, image.filename)
+            return GatewayMessageKind.SUBMITTED, task
+
+        self._run(job_id, add_task)
+
+    def poll(
+        self,
+        gateway: GatewayApi,
+        job_id: str,
+        decoder: Callable[[], Any] = ResultCollector,
+        on_result: Callable[[bytes], None] | None = None,
+    ) -> None:
+        """Gets the task status and, once it succeeded, streams the result into a decoder.
+
+        `decoder` creates an object with `feed(chunk)` and `finish()`; chunks are
+        fed while they download and `finish()` becomes the RESULT payload.
+        `on_result` is called with the downloaded bytes on the worker thread.
+        """
+
+        def get_status():
+            response = gateway.get_status(job_id)
+            if response.status != GatewayTaskStatus.SUCCESS:
+                return GatewayMessageKind.STATUS, response
+
+            result = decoder()
+            data = bytearray() if on_result is not None else None
+
+            def on_chunk(chunk):
+                if data is not None:
+                    data.extend(chunk)
+                result.feed(chunk)
+
+            gateway.stream_result(job_id, on_chunk, self._progress(job_id))
+            payload = result.finish()
+            if on_result is not None:
+                self._handle_result(job_id, on_result, bytes(data))
+            return GatewayMessageKind.RESULT, payload
+
+        self._run(job_id, get_status)
+
+    def drain(self) -> list[GatewayMessage]:
+        """Returns all messages that arrived since the last call. Main thread only."""
+        messages = []
+        while True:
+            try:
+                message = self._messages.get_nowait()
+            except queue.Empty:
+                return messages
+            if message.kind != GatewayMessageKind.PROGRESS:
+                self._busy.discard(message.job_id)
+            messages.append(message)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _handle_result(self, job_id: str, on_result: Callable[[bytes], None], data: bytes) -> None:
+        try:
+            on_result(data)
+        except Exception as e:
+            print(f"Result handler of {job_id} failed: {e}")
+
+    def _progress(self, job_id: str) -> Callable[[int, int | None], None]:
+        def on_progress(received, total):
+            self._messages.put(GatewayMessage(job_id, GatewayMessageKind.PROGRESS, (received, total)))
+
+        return on_progress
+
+    def _run(self, job_id: str, request: Callable[[], tuple[GatewayMessageKind, Any]]) -> None:
+        self._busy.add(job_id)
+        self._executor.submit(self._call, job_id, request)
+
+    def _call(self, job_id: str, request: Callable[[], tuple[GatewayMessageKind, Any]]) -> None:
+        try:
+            kind, payload = request()
+        except Exception as e:
+            kind, payload = GatewayMessageKind.ERROR, e
+        self._messages.put(GatewayMessage(job_id, kind, payload))
+
+
+class AsyncGatewayWorker(GatewayWorker):
+    """GatewayWorker running requests as coroutines of one asyncio event loop.
+
+    The loop runs in a background thread and drives an AsyncGatewayApi, whose
+    semaphore lets up to MAX_CONCURRENCY requests be in flight without a
+    thread per request. Only what blocks, the decoder's `feed` and `finish`
+    and the result handler, runs on the base class's thread pool.
+    """
+
+    MAX_CONCURRENCY: int = 64
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="threegen-gateway-loop", daemon=True)
+        self._thread.start()
+        # Async client of the last GatewayApi seen, rebuilt when get_gateway returns a new one
+        self._gateway: GatewayApi | None = None
+        self._client: AsyncGatewayApi | None = None
+
+    def warm_up(self, gateway: GatewayApi) -> None:
+        asyncio.run_coroutine_threadsafe(self._async_client(gateway).warm_up(), self._loop)
+
+    def submit_text(self, gateway: GatewayApi, job_id: str, prompt: str, obj_type: str, seed: int) -> None:
+        client = self._async_client(gateway)
+
+        async def add_task():
+            return GatewayMessageKind.SUBMITTED, await client.add_text_task(prompt, obj_type, seed)
+
+        self._run(job_id, add_task)
+
+    def submit_image(self, gateway: GatewayApi, job_id: str, image: EncodedImage, obj_type: str, seed: int) -> None:
+        client = self._async_client(gateway)
+
+        async def add_task():
+            task = await client.add_image_task(image.data, obj_type, seed, image.content_type, image.filename)
+            return GatewayMessageKind.SUBMITTED, task
+
+        self._run(job_id, add_task)
+
+    def poll(
+        self,
+        gateway: GatewayApi,
+        job_id: str,
+        decoder: Callable[[], Any] = ResultCollector,
+        on_result: Callable[[bytes], None] | None = None,
+    ) -> None:
+        client = self._async_client(gateway)
+
+        async def get_status():
+            response = await client.get_status(job_id)
+            if response.status != GatewayTaskStatus.SUCCESS:
+                return GatewayMessageKind.STATUS, response
+
+            loop = asyncio.get_running_loop()
+            result = decoder()
+            data = bytearray() if on_result is not None else None
+
+            async def on_chunk(chunk):
+                if data is not None:
+                    data.extend(chunk)
+                await loop.run_in_executor(self._executor, result.feed, chunk)
+
+            await client.stream_result(job_id, on_chunk, self._progress(job_id))
+            payload = await loop.run_in_executor(self._executor, result.finish)
+            if on_result is not None:
+                await loop.run_in_executor(self._executor, self._handle_result, job_id, on_result, bytes(data))
+            return GatewayMessageKind.RESULT, payload
+
+        self._run(job_id, get_status)
+
+    def shutdown(self) -> None:
+        if self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._stop(), self._loop)
+        super().shutdown()
+
+    def _async_client(self, gateway: GatewayApi) -> AsyncGatewayApi:
+        if self._gateway is not gateway:
+            if self._client is not None:
+                asyncio.run_coroutine_threadsafe(self._client.close(), self._loop)
+            self._client = AsyncGatewayApi.from_gateway(gateway, self.MAX_CONCURRENCY)
+            self._gateway = gateway
+        return self._client
+
+    def _run(self, job_id: str, request: Callable[[], Any]) -> None:
+        self._busy.add(job_id)
+        asyncio.run_coroutine_threadsafe(self._call_async(job_id, request), self._loop)
+
+    async def _call_async(self, job_id: str, request: Callable[[], Any]) -> None:
+        try:
+            kind, payload = await request()
+        except Exception as e:
+            kind, payload = GatewayMessageKind.ERROR, e
+        self._messages.put(GatewayMessage(job_id, kind, payload))
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _stop(self) -> None:
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.close()
+        self._loop.stop()
+
+
+_worker_instance = None
+
+
+def get_worker() -> GatewayWorker:
+    """Returns the worker of the gateway client selected in the preferences."""
+    global _worker_instance
+    worker_type = AsyncGatewayWorker if get_preferences().gateway_client == "ASYNCIO" else GatewayWorker
+    # Switched only once the current worker has nothing in flight
+    if _worker_instance is not None and type(_worker_instance) is not worker_type and not _worker_instance.has_pending():
+        shutdown_worker()
+    if _worker_instance is None:
+        _worker_instance = worker_type()
+    return _worker_instance
+
+
+def shutdown_worker() -> None:
+    global _worker_instance
+    if _worker_instance is not None:
+        _worker_instance.shutdown()
+        _worker_instance = None
@@ -1,10 +1,19 @@
 import bpy
+import json
+import mmap
+import numpy as np
 import os,re
-from bpy_extras.io_utils import ImportHelper
+from bpy_extras.io_utils import ExportHelper, ImportHelper
 from bpy.types import Context, Operator
-from bpy.props import StringProperty, BoolProperty, EnumProperty
+from bpy.props import StringProperty, BoolProperty, EnumProperty, FloatProperty, IntProperty
 
-from .util.gaussian_splatting import import_gs
+from .batch import read_batch_file
+from .cache import get_import_cache, get_result_cache
+from .props import OBJECT_ENUM_ITEMS, new_import_profile
+from .preferences import DECIMATION_ENUM_ITEMS, get_preferences
+from .util.gaussian_splatting import DEFAULT_MIN_OPACITY, RECOMMENDED_MAX_GAUSSIANS, ImportOptions, export_gs, import_cache_key, import_gs_steps, keep_splats
+from .util.profiling import clear_profiles, get_profiles
+from .util.spatial import get_mesh_grid, query_oriented_box, query_world_sphere
 
 class GenerateOperator(Operator):
     """Generate 3DGS model"""
@@ -63,26 +72,13 @@ class OpenImageOperator(Operator, ImportHelper):
     )
 
     def execute(self, context):
-        max_size = 1024
         threegen = context.window_manager.threegen
         image_path = self.filepath
         try:
-            # Load the image into bpy.data.images
+            # Load the image into bpy.data.images, it is scaled down when encoded for upload
             img = bpy.data.images.load(image_path, check_existing=True)
             threegen.image = img
 
-            width, height = img.size
-            if width >= height:
-                new_width = max_size
-                new_height = int(height * (max_size / width))
-            else:
-                new_height = max_size
-                new_width = int(width * (max_size / height))
-
-            if (new_width, new_height) != (width, height):
-                img.scale(new_width, new_height)
-
-
             self.report({'INFO'}, f"Loaded image: {img.name}")
         except RuntimeError:
             self.report({'ERROR'}, "Could not load image. Check the file path.")
@@ -100,38 +96,457 @@ class ImportOperator(Operator, ImportHelper):
         options={"HIDDEN"},
         maxlen=255,  # Max internal buffer length, longer would be clamped.
     )
-    use_setting: BoolProperty(
-        name="Example Boolean",
-        description="Example Tooltip",
+    min_opacity: FloatProperty(
+        name="Min Opacity",
+        description="Splats less opaque than this are left out of the mesh, 0 keeps all of them",
+        default=DEFAULT_MIN_OPACITY,
+        min=0.0,
+        max=1.0,
+        precision=3,
+    )
+    reorder: BoolProperty(
+        name="Importance Order",
+        description="Store the most significant splats first, so a low Display Percentage shows a usable preview",
         default=True,
     )
-
-    type: EnumProperty(
-        name="Example Enum",
-        description="Choose between two items",
-        items=(
-            ("OPT_A", "First Option", "Description one"),
-            ("OPT_B", "Second Option", "Description two"),
-        ),
-        default="OPT_A",
+    decimate: BoolProperty(
+        name="Decimate",
+        description="Keep only the most important splats of large files",
+        default=False,
+    )
+    max_splats: IntProperty(
+        name="Max Splats",
+        description="Splats kept at most when decimating",
+        default=RECOMMENDED_MAX_GAUSSIANS,
+        min=1,
+    )
+    decimation: EnumProperty(
+        name="Method",
+        description="How splats over the limit are removed",
+        items=DECIMATION_ENUM_ITEMS,
+        default="TOP",
     )
 
     def execute(self, context):
         base_name = os.path.basename(self.filepath)
         name, _ = os.path.splitext(base_name)
         name = re.sub(r"\s+", "_", name)
-        with open(self.filepath, "rb") as f:
-            obj = import_gs(f, name)
+        try:
+            # Map the file so the PLY body is parsed in place instead of read into memory
+            self._file = open(self.filepath, "rb")
+            self._mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            self._close_file()
+            self.report({"ERROR"}, f"Could not import {base_name}: {e}")
+            return {"CANCELLED"}
 
-        return {"FINISHED"}
+        options = ImportOptions(self.max_splats if self.decimate else 0, self.decimation, self.min_opacity, self.reorder)
+        cache, key = None, ""
+        if get_preferences().use_import_cache:
+            cache, key = get_import_cache(), import_cache_key(self.filepath, options)
+
+        self._base_name = base_name
+        self._profile = new_import_profile(name)
+        self._steps = import_gs_steps(self._mapped, name, profile=self._profile, options=options, cache=cache, cache_key=key)
+
+        wm = context.window_manager
+        wm.progress_begin(0, 100)
+        self._timer = wm.event_timer_add(0.01, window=context.window)
+        wm.modal_handler_add(self)
+        return {"RUNNING_MODAL"}
+
+    def modal(self, context, event):
+        if event.type == "ESC":
+            try:
+                self._steps.close()
+            finally:
+                self._finish(context)
+            self.report({"WARNING"}, f"Import of {self._base_name} cancelled")
+            return {"CANCELLED"}
+
+        if event.type != "TIMER":
+            return {"PASS_THROUGH"}
+
+        try:
+            progress = next(self._steps)
+        except StopIteration:
+            self._finish(context)
+            source = self._profile.stats.get("source splats")
+            if source is not None and source != self._profile.count:
+                self.report({"INFO"}, f"Imported {self._profile.count:,} of {source:,} splats from {self._base_name}")
+            return {"FINISHED"}
+        except Exception as e:
+            # Anything the import raises ends it, the timer, progress bar and file must not leak
+            self._finish(context)
+            self.report({"ERROR"}, f"Could not import {self._base_name}: {e}")
+            return {"CANCELLED"}
+
+        context.window_manager.progress_update(int(progress * 100))
+        return {"RUNNING_MODAL"}
+
+    def _finish(self, context):
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        self._steps = None
+        self._profile.close()
+        self._close_file()
+
+    def _close_file(self):
+        for attr in ("_mapped", "_file"):
+            handle = getattr(self, attr, None)
+            if handle is not None:
+                handle.close()
+                setattr(self, attr, None)
   
 
+class ExportOperator(Operator, ExportHelper):
+    """Export the active splat object as a 3DGS PLY"""
+
+    bl_idname = "threegen.export"
+    bl_label = "Export"
+    filename_ext = ".ply"
+
+    filter_glob: StringProperty(
+        default="*.ply",
+        options={"HIDDEN"},
+        maxlen=255,
+    )
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and obj.type == "MESH" and "Gaussian Splatting" in obj.modifiers
+
+    def execute(self, context):
+        obj = context.active_object
+        if obj.mode == "EDIT":
+            # Edits are only written to the mesh data when leaving edit mode
+            obj.update_from_editmode()
+        try:
+            with open(self.filepath, "wb") as f:
+                count = export_gs(obj, f)
+        except (OSError, ValueError) as e:
+            self.report({"ERROR"}, f"Could not export {obj.name}: {e}")
+            return {"CANCELLED"}
+        self.report({"INFO"}, f"Exported {count:,} splats to {os.path.basename(self.filepath)}")
+        return {"FINISHED"}
+
+
+class ClearResultCacheOperator(Operator):
+    """Remove all cached generation results"""
+
+    bl_idname = "threegen.clear_result_cache"
+    bl_label = "Clear Result Cache"
+
+    def execute(self, context:Context):
+        get_result_cache().clear()
+        self.report({'INFO'}, "Result cache cleared")
+        return {"FINISHED"}
+
+
+class ClearImportCacheOperator(Operator):
+    """Remove the cached splats of all imported files"""
+
+    bl_idname = "threegen.clear_import_cache"
+    bl_label = "Clear Import Cache"
+
+    def execute(self, context:Context):
+        get_import_cache().clear()
+        self.report({'INFO'}, "Import cache cleared")
+        return {"FINISHED"}
+
+
+class BatchGenerateOperator(Operator, ImportHelper):
+    """Generate a job for every prompt or image path in a text or CSV file"""
+
+    bl_idname = "threegen.batch_generate"
+    bl_label = "Batch Generate"
+
+    filter_glob: StringProperty(
+        default="*.txt;*.csv",
+        options={"HIDDEN"},
+    )
+    obj_type: EnumProperty(
+        name="Object type",
+        description="Object type of rows that don't set one",
+        items=OBJECT_ENUM_ITEMS,
+    )
+    seed: IntProperty(
+        name="Seed",
+        description="Seed of rows that don't set one, -1 for a random seed",
+        default=-1,
+        min=-1,
+    )
+    max_in_flight: IntProperty(
+        name="Jobs in Flight",
+        description="Maximum number of batch jobs running at the same time",
+        default=8,
+        min=1,
+        max=256,
+    )
+    per_minute: FloatProperty(
+        name="Submissions per Minute",
+        description="Pace at which jobs are submitted, lowered automatically when the gateway rate limits",
+        default=30.0,
+        min=0.1,
+    )
+
+    def execute(self, context:Context):
+        try:
+            items = read_batch_file(self.filepath, self.obj_type, self.seed)
+        except (OSError, ValueError) as e:
+            self.report({"ERROR"}, f"Could not read batch: {e}")
+            return {"CANCELLED"}
+        if not items:
+            self.report({"WARNING"}, "Batch file has no prompts or images")
+            return {"CANCELLED"}
+
+        context.window_manager.threegen.job_manager.start_batch(items, self.max_in_flight, self.per_minute)
+        self.report({"INFO"}, f"Queued {len(items)} jobs")
+        return {"FINISHED"}
+
+
+class CancelBatchOperator(Operator):
+    """Stop submitting the remaining jobs of the batch, or dismiss a finished batch"""
+
+    bl_idname = "threegen.cancel_batch"
+    bl_label = "Cancel Batch"
+
+    def execute(self, context:Context):
+        context.window_manager.threegen.job_manager.cancel_batch()
+        return {"FINISHED"}
+
+
+class ExportProfilesOperator(Operator, ExportHelper):
+    """Save the recorded import profiles as JSON"""
+
+    bl_idname = "threegen.export_profiles"
+    bl_label = "Export Import Profiles"
+    filename_ext = ".json"
+
+    filter_glob: StringProperty(
+        default="*.json",
+        options={"HIDDEN"},
+    )
+
+    def execute(self, context:Context):
+        report = {
+            "blender": bpy.app.version_string,
+            "profiles": [profile.to_dict() for profile in reversed(get_profiles())],
+        }
+        try:
+            with open(self.filepath, "w") as f:
+                json.dump(report, f, indent=2)
+        except OSError as e:
+            self.report({"ERROR"}, f"Could not export profiles: {e}")
+            return {"CANCELLED"}
+        self.report({"INFO"}, f"Exported {len(report['profiles'])} profiles")
+        return {"FINISHED"}
+
+
+class ClearProfilesOperator(Operator):
+    """Forget the recorded import profiles"""
+
+    bl_idname = "threegen.clear_profiles"
+    bl_label = "Clear Import Profiles"
+
+    def execute(self, context:Context):
+        clear_profiles()
+        return {"FINISHED"}
+
+
+def _splat_objects(context, exclude=None):
+    """Selected splat objects, or the active one if it is the only splat object."""
+    objects = [obj for obj in context.selected_objects if "Gaussian Splatting" in obj.modifiers]
+    active = context.active_object
+    if not objects and active is not None and "Gaussian Splatting" in active.modifiers:
+        objects = [active]
+    return [obj for obj in objects if obj != exclude]
+
+
+def _in_object_mode(context, operation):
+    """Runs `operation()` in object mode, where mesh data can be written, and returns to edit mode after."""
+    was_editing = context.mode == "EDIT_MESH"
+    if was_editing:
+        bpy.ops.object.mode_set(mode="OBJECT")
+    try:
+        return operation()
+    finally:
+        if was_editing:
+            bpy.ops.object.mode_set(mode="EDIT")
+
+
+def _object_bounds(obj):
+    corners = np.array(obj.bound_box, dtype=np.float64)
+    return corners.min(axis=0), corners.max(axis=0)
+
+
+class CropToBoundsOperator(Operator):
+    """Remove the splats of the selected splat objects outside the bounding box of the active object"""
+
+    bl_idname = "threegen.crop_to_bounds"
+    bl_label = "Crop to Active Bounds"
+    bl_options = {"REGISTER", "UNDO"}
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None and bool(_splat_objects(context, exclude=context.active_object))
+
+    def execute(self, context:Context):
+        bounds = context.active_object
+        lo, hi = _object_bounds(bounds)
+        to_bounds = np.array(bounds.matrix_world.inverted(), dtype=np.float64)
+
+        def crop():
+            removed = 0
+            for obj in _splat_objects(context, exclude=bounds):
+                grid = get_mesh_grid(obj.data)
+                keep = query_oriented_box(grid, to_bounds @ np.array(obj.matrix_world, dtype=np.float64), lo, hi)
+                removed += len(grid) - len(keep)
+                keep_splats(obj, keep)
+            return removed
+
+        removed = _in_object_mode(context, crop)
+        self.report({"INFO"}, f"Removed {removed:,} splats")
+        return {"FINISHED"}
+
+
+class DeleteOutsideRadiusOperator(Operator):
+    """Remove the splats of the selected splat objects farther than a radius from the 3D cursor"""
+
+    bl_idname = "threegen.delete_outside_radius"
+    bl_label = "Delete Outside Radius"
+    bl_options = {"REGISTER", "UNDO"}
+
+    radius: FloatProperty(
+        name="Radius",
+        description="Splats farther from the 3D cursor are removed",
+        default=1.0,
+        min=0.0,
+        subtype="DISTANCE",
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return bool(_splat_objects(context))
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context:Context):
+        center = np.array(context.scene.cursor.location, dtype=np.float64)
+
+        def delete():
+            removed = 0
+            for obj in _splat_objects(context):
+                grid = get_mesh_grid(obj.data)
+                keep = query_world_sphere(grid, np.array(obj.matrix_world, dtype=np.float64), center, self.radius)
+                removed += len(grid) - len(keep)
+                keep_splats(obj, keep)
+            return removed
+
+        removed = _in_object_mode(context, delete)
+        self.report({"INFO"}, f"Removed {removed:,} splats")
+        return {"FINISHED"}
+
+
+class SelectRegionOperator(Operator):
+    """Select the splats of the active splat object inside a sphere around the 3D cursor or another object's bounds"""
+
+    bl_idname = "threegen.select_region"
+    bl_label = "Select Splat Region"
+    bl_options = {"REGISTER", "UNDO"}
+
+    region: EnumProperty(
+        name="Region",
+        items=(
+            ("SPHERE", "Sphere", "Splats within the radius of the 3D cursor"),
+            ("BOUNDS", "Object Bounds", "Splats inside the bounding box of an object"),
+        ),
+        default="SPHERE",
+    )
+    radius: FloatProperty(
+        name="Radius",
+        default=1.0,
+        min=0.0,
+        subtype="DISTANCE",
+    )
+    bounds_object: StringProperty(
+        name="Object",
+        description="Object whose bounding box is selected",
+    )
+    extend: BoolProperty(
+        name="Extend",
+        description="Add to the current selection instead of replacing it",
+        default=False,
+    )
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and "Gaussian Splatting" in obj.modifiers
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "region")
+        if self.region == "SPHERE":
+            layout.prop(self, "radius")
+        else:
+            layout.prop_search(self, "bounds_object", bpy.data, "objects")
+        layout.prop(self, "extend")
+
+    def execute(self, context:Context):
+        obj = context.active_object
+        to_world = np.array(obj.matrix_world, dtype=np.float64)
+        if self.region == "BOUNDS":
+            bounds = bpy.data.objects.get(self.bounds_object)
+            if bounds is None:
+                self.report({"ERROR"}, "Choose the object whose bounds are selected")
+                return {"CANCELLED"}
+            lo, hi = _object_bounds(bounds)
+            to_bounds = np.array(bounds.matrix_world.inverted(), dtype=np.float64)
+
+        def select():
+            mesh = obj.data
+            grid = get_mesh_grid(mesh)
+            if self.region == "BOUNDS":
+                indices = query_oriented_box(grid, to_bounds @ to_world, lo, hi)
+            else:
+                indices = query_world_sphere(grid, to_world, np.array(context.scene.cursor.location, dtype=np.float64), self.radius)
+
+            selected = np.zeros(len(grid), dtype=bool)
+            if self.extend:
+                mesh.vertices.foreach_get("select", selected)
+            selected[indices] = True
+            mesh.vertices.foreach_set("select", selected)
+            mesh.update()
+            return len(indices)
+
+        count = _in_object_mode(context, select)
+        self.report({"INFO"}, f"Selected {count:,} splats")
+        return {"FINISHED"}
+
+
 classes = (
     GenerateOperator,
+    BatchGenerateOperator,
+    CancelBatchOperator,
     RemoveJobOperator,
     RestartJobOperator,
     ImportOperator,
+    ExportOperator,
     OpenImageOperator,
+    ClearResultCacheOperator,
+    ClearImportCacheOperator,
+    ExportProfilesOperator,
+    ClearProfilesOperator,
+    CropToBoundsOperator,
+    DeleteOutsideRadiusOperator,
+    SelectRegionOperator,
 )
 
 register, unregister = bpy.utils.register_classes_factory(classes)
@@ -1,17 +1,188 @@
 from bpy.types import AddonPreferences, Context, UILayout
-from bpy.props import StringProperty
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty, StringProperty
 import bpy
 
+from .util.gaussian_splatting import DEFAULT_MIN_OPACITY, RECOMMENDED_MAX_GAUSSIANS
+
+DECIMATION_ENUM_ITEMS = [
+    ("TOP", "Most Important", "Keep the splats with the highest opacity times size"),
+    ("MERGE", "Merge", "Keep the most important splats, merge the others with their neighbors"),
+]
+
 class ThreegenPreferences(AddonPreferences):
     bl_idname = __package__
     url: StringProperty(default="https://gateway-us-west.404.xyz")
     token: StringProperty(default="6eca4068-3be6-4d30-b828-f63cda3bc35b")
+    connect_timeout: FloatProperty(
+        name="Connect Timeout",
+        description="Seconds to wait for a connection to the gateway",
+        default=5.0,
+        min=0.5,
+        subtype="TIME_ABSOLUTE",
+        unit="TIME_ABSOLUTE",
+    )
+    read_timeout: FloatProperty(
+        name="Read Timeout",
+        description="Seconds to wait for the gateway to respond before a request fails",
+        default=30.0,
+        min=1.0,
+        subtype="TIME_ABSOLUTE",
+        unit="TIME_ABSOLUTE",
+    )
+    request_retries: IntProperty(
+        name="Retries",
+        description="How often failed status and result requests, and rate limited submissions, are retried",
+        default=3,
+        min=0,
+        max=10,
+    )
+    gateway_client: EnumProperty(
+        name="Gateway Client",
+        description="How requests to the gateway are run",
+        items=[
+            ("THREADS", "Threads", "Run requests on a small thread pool"),
+            ("ASYNCIO", "Asyncio", "Drive requests from an asyncio event loop with many more in flight, suited for many jobs at once"),
+        ],
+        default="THREADS",
+    )
+    warm_up_connection: BoolProperty(
+        name="Warm Up Connection",
+        description="Connect to the gateway when the add-on is enabled, so the first generation doesn't wait for the TLS handshake",
+        default=False,
+    )
+    spz_decoder: EnumProperty(
+        name="SPZ Decoder",
+        description="How generated 3DGS results are decoded",
+        items=[
+            ("AUTO", "Automatic", "Use the native SPZ library, fall back to the built-in decoder if it is missing"),
+            ("NATIVE", "Native", "Always use the native SPZ library"),
+            ("BUILTIN", "Built-in", "Decode with the built-in NumPy decoder, the native library is not downloaded"),
+        ],
+        default="AUTO",
+    )
+    min_opacity: FloatProperty(
+        name="Min Opacity",
+        description="Splats of generated results less opaque than this are left out of the mesh, 0 keeps all of them",
+        default=DEFAULT_MIN_OPACITY,
+        min=0.0,
+        max=1.0,
+        precision=3,
+    )
+    decimate_results: BoolProperty(
+        name="Decimate Results",
+        description="Keep only the most important splats of generated 3DGS results larger than the limit",
+        default=False,
+    )
+    max_gaussians: IntProperty(
+        name="Max Splats",
+        description="Splats kept at most when decimating generated results",
+        default=RECOMMENDED_MAX_GAUSSIANS,
+        min=1,
+    )
+    decimation: EnumProperty(
+        name="Method",
+        description="How splats over the limit are removed",
+        items=DECIMATION_ENUM_ITEMS,
+        default="TOP",
+    )
+    upload_format: EnumProperty(
+        name="Image Upload Format",
+        description="Format images are uploaded in for image to 3D generation",
+        items=[
+            ("PNG", "PNG", "Lossless"),
+            ("JPEG", "JPEG", "Lossy, smallest uploads"),
+            ("WEBP", "WebP", "Lossy, small uploads"),
+        ],
+        default="PNG",
+    )
+    upload_max_edge: IntProperty(
+        name="Max Image Size",
+        description="Images are scaled down so their longest edge is at most this many pixels before upload, 0 keeps the full size",
+        default=1024,
+        min=0,
+        subtype="PIXEL",
+    )
+    upload_quality: IntProperty(
+        name="Quality",
+        description="Compression quality of lossy image uploads",
+        default=90,
+        min=1,
+        max=100,
+        subtype="PERCENTAGE",
+    )
+    profile_memory: BoolProperty(
+        name="Profile Memory",
+        description="Record the peak memory of every import stage with tracemalloc, which slows imports down",
+        default=False,
+    )
+    use_result_cache: BoolProperty(
+        name="Cache Results",
+        description="Reuse results of identical generations with a fixed seed instead of asking the gateway again",
+        default=True,
+    )
+    result_cache_size: IntProperty(
+        name="Cache Size (MB)",
+        description="Maximum disk space used by cached results, least recently used results are removed first",
+        default=1024,
+        min=0,
+    )
+
+    use_import_cache: BoolProperty(
+        name="Cache Imports",
+        description="Keep the processed splats of imported files so importing an unchanged file again skips parsing it",
+        default=True,
+    )
+    import_cache_size: IntProperty(
+        name="Cache Size (MB)",
+        description="Maximum disk space used by cached imports, least recently used imports are removed first",
+        default=4096,
+        min=0,
+    )
 
     def draw(self, context: Context):
         layout: UILayout = self.layout
         col = layout.column()
         col.prop(self, "url", text="URL")
         col.prop(self, "token", text="API Key")
+        row = col.row()
+        row.prop(self, "connect_timeout")
+        row.prop(self, "read_timeout")
+        row.prop(self, "request_retries")
+        row = col.row()
+        row.prop(self, "gateway_client")
+        row.prop(self, "warm_up_connection")
+        row = col.row()
+        row.prop(self, "spz_decoder")
+        row.prop(self, "profile_memory")
+        row = col.row()
+        row.prop(self, "min_opacity")
+        row.prop(self, "decimate_results")
+        sub = row.row()
+        sub.enabled = self.decimate_results
+        sub.prop(self, "max_gaussians")
+        sub.prop(self, "decimation")
+        row = col.row()
+        row.prop(self, "upload_format")
+        row.prop(self, "upload_max_edge")
+        sub = row.row()
+        sub.enabled = self.upload_format != "PNG"
+        sub.prop(self, "upload_quality")
+        row = col.row()
+        row.prop(self, "use_result_cache")
+        sub = row.row()
+        sub.enabled = self.use_result_cache
+        sub.prop(self, "result_cache_size")
+        sub.operator("threegen.clear_result_cache", text="", icon="TRASH")
+        row = col.row()
+        row.prop(self, "use_import_cache")
+        sub = row.row()
+        sub.enabled = self.use_import_cache
+        sub.prop(self, "import_cache_size")
+        sub.operator("threegen.clear_import_cache", text="", icon="TRASH")
+
+def get_preferences() -> ThreegenPreferences:
+    return bpy.context.preferences.addons[__package__].preferences
+
 
 classes = (
     ThreegenPreferences,
@@ -1,17 +1,26 @@
+import functools
 import os
 import re
 import time
 import uuid
-from io import BytesIO
 
 import bpy
 
-from .gateway.gateway_api import get_gateway
+from .batch import BatchQueue
+from .cache import get_result_cache
+from .gateway.gateway_api import GatewayAddTaskError, GatewayApi, get_gateway
+from .gateway.gateway_scheduler import PollScheduler
 from .gateway.gateway_task import GatewayTaskStatus
-from .spz_loader import get_spz
-from .util.gaussian_splatting import import_gs
+from .gateway.gateway_worker import GatewayMessageKind, ResultCollector, get_worker, shutdown_worker
+from .preferences import get_preferences
+from .spz_loader import splat_decoder
+from .util.gaussian_splatting import ImportOptions, import_gs_steps
 from .util.glb import import_glb
+from .util.disk_cache import cache_key
+from .util.image import encode_image, image_pixel_hash
 from .util.positioning import align_and_fit
+from .util.profiling import ImportProfile
+from .util.profiling import close as close_profile
 
 
 def on_image_change(self, context):
@@ -25,6 +34,24 @@ def on_image_change(self, context):
 
 _job_manager_timer_registred: bool = False
 
+# Job ID -> running import_gs_steps generator, stepped one chunk per timer tick
+_job_imports: dict = {}
+
+# Job ID -> ImportProfile its result is decoded and imported with
+_job_profiles: dict = {}
+
+# Job ID -> (bytes received, total bytes or None) of results being downloaded
+_job_downloads: dict = {}
+
+# Status poll deadlines of submitted jobs
+_poll_scheduler = PollScheduler()
+
+# Batch being fed into the job list, kept after it finished for its figures
+_batch_queue: BatchQueue | None = None
+
+# Job ID -> time.monotonic() a rate limited submission outside a batch is sent again
+_job_resubmits: dict = {}
+
 
 def job_manager_timer_callback():
     global _job_manager_timer_registred
@@ -38,13 +65,75 @@ def job_manager_timer_callback():
     except Exception as e:
         print(e)
 
+    if job_manager.has_importing_jobs():
+        _redraw_view3d()
+        return 0.01
+
+    if _job_downloads or _batch_queue is not None:
+        _redraw_view3d()
+
+    # Sleep until the next job is due, but handle in-flight responses promptly
+    delay = _poll_scheduler.next_delay()
+    if get_worker().has_pending():
+        delay = min(delay, 0.1) if delay is not None else 0.1
+    batch_delay = job_manager.batch_delay()
+    if batch_delay is not None:
+        delay = min(delay, batch_delay) if delay is not None else batch_delay
+    if _job_resubmits:
+        resubmit_delay = max(min(_job_resubmits.values()) - time.monotonic(), 0.0)
+        delay = min(delay, resubmit_delay) if delay is not None else resubmit_delay
+
+    if delay is not None:
+        return max(delay, 0.01)
+
     if job_manager.has_active_jobs():
-        return 2.0
+        return PollScheduler.MIN_INTERVAL
 
     _job_manager_timer_registred = False
     return None
 
 
+def _register_timer():
+    global _job_manager_timer_registred
+    if not _job_manager_timer_registred:
+        bpy.app.timers.register(job_manager_timer_callback)
+        _job_manager_timer_registred = True
+
+
+def _redraw_view3d():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
+
+
+# Object type -> file suffix of cached results
+RESULT_SUFFIXES = {"3DGS": ".spz", "MESH": ".glb"}
+
+
+def result_decoder(obj_type, profile=None):
+    """Factory of the incremental decoder the result of an `obj_type` job is streamed into."""
+    if obj_type == "3DGS":
+        return functools.partial(splat_decoder, get_preferences().spz_decoder, profile)
+    return ResultCollector
+
+
+def import_options():
+    """Options generated 3DGS results are imported with."""
+    prefs = get_preferences()
+    return ImportOptions(prefs.max_gaussians if prefs.decimate_results else 0, prefs.decimation, prefs.min_opacity)
+
+
+def _replace_profile(job_id, profile):
+    """Makes `profile` the job's profile, closing the one it replaces, and returns it."""
+    close_profile(_job_profiles.get(job_id))
+    _job_profiles[job_id] = profile
+    return profile
+
+
+def new_import_profile(name):
+    return ImportProfile(name, trace_memory=get_preferences().profile_memory)
+
 OBJECT_ENUM_ITEMS = [
     ("3DGS", "3DGS", "3DGS"),
     ("MESH", "Mesh", "Mesh"),
@@ -85,23 +174,20 @@ class Job(bpy.types.PropertyGroup):
         description="A custom image property",
     )
     open: bpy.props.BoolProperty(default=False)
+    progress: bpy.props.FloatProperty(min=0.0, max=1.0)
+    cache_key: bpy.props.StringProperty()
+    batch: bpy.props.BoolProperty(default=False)
+    # Submissions rejected with 429/503 in a row
+    rate_limited: bpy.props.IntProperty()
 
 
 class JobManager(bpy.types.PropertyGroup):
     jobs: bpy.props.CollectionProperty(type=Job)
 
     def add_job(self):
-        global _job_manager_timer_registred
         threegen = bpy.context.window_manager.threegen
-        job = self.jobs.add()
-        # Temporary local ID for UI actions before submit, replaced with gateway task ID on success.
-        job.id = str(uuid.uuid4())
-        job.crtime = time.time()
-        job.status = "RUNNING"
-        job.prompt = threegen.prompt
-        job.image = threegen.image
-        job.seed = -1 if threegen.randomize_seed else threegen.seed
-        job.obj_type = threegen.obj_type
+        seed = -1 if threegen.randomize_seed else threegen.seed
+        job = self.new_job(threegen.prompt, threegen.image, threegen.obj_type, seed)
 
         try:
             if threegen.replace_active_obj:
@@ -110,54 +196,172 @@ class JobManager(bpy.types.PropertyGroup):
                     dims = job.replace_obj.dimensions
                     job.prompt = f"{job.prompt}, {int(dims.x * 100)}cm wide, {int(dims.y * 100)}cm deep and {int(dims.z * 100)}cm high"
 
-            if job.image:
-                img_path = job.image.filepath_from_user()
-                job.name, _ = os.path.splitext(os.path.basename(img_path))
-                task = get_gateway().add_image_task(job.image, job.obj_type, job.seed)
-            else:
-                job.name = re.sub(r"\s+", "_", threegen.prompt)
-                task = get_gateway().add_text_task(job.prompt, job.obj_type, job.seed)
+            self.submit_job(job)
+        except Exception as e:
+            job.status = "FAILED"
+            job.reason = str(e)
 
-            job.id = task.id
+    def new_job(self, prompt, image, obj_type, seed):
+        """Adds a job to the list without submitting it."""
+        job = self.jobs.add()
+        job.id = str(uuid.uuid4())
+        job.crtime = time.time()
+        job.prompt = prompt
+        job.image = image
+        job.seed = seed
+        job.obj_type = obj_type
+
+        if image:
+            img_path = image.filepath_from_user()
+            job.name, _ = os.path.splitext(os.path.basename(img_path))
+        else:
+            job.name = re.sub(r"\s+", "_", prompt)
+        return job
+
+    def start_batch(self, items, max_in_flight, per_minute):
+        """Queues batch `items`, they are submitted as jobs at the pace of a token bucket by `feed_batch`."""
+        global _batch_queue
+        if _batch_queue is not None:
+            self.cancel_batch()
+        # Failures of earlier batches don't count against this one
+        for job in self.jobs:
+            job.batch = False
+        _batch_queue = BatchQueue(items, max_in_flight, per_minute)
+        _register_timer()
+
+    def cancel_batch(self):
+        """Stops submitting the current batch, or dismisses it once everything was submitted."""
+        global _batch_queue
+        if _batch_queue is None:
+            return
+        if not _batch_queue.has_pending():
+            _batch_queue = None
+            return
+        for id in _batch_queue.cancel():
+            job = self.get_job(id)
+            if job is not None:
+                job.status = "FAILED"
+                job.reason = "batch cancelled"
+
+    def feed_batch(self):
+        """Submits batch items while the token bucket and the in-flight limit allow."""
+        batch = _batch_queue
+        if batch is None:
+            return
+
+        in_flight = sum(job.batch and job.status == "RUNNING" for job in self.jobs)
+        while batch.has_pending() and in_flight < batch.max_in_flight and batch.bucket.try_acquire():
+            id = batch.pop_retry()
+            if id is not None:
+                job = self.get_job(id)
+                if job is None:
+                    # Removed while waiting to be resubmitted
+                    continue
+            else:
+                item = batch.pop_item()
+                image = None
+                if item.image_path:
+                    try:
+                        image = bpy.data.images.load(item.image_path, check_existing=True)
+                    except RuntimeError:
+                        job = self.new_job(item.prompt or os.path.basename(item.image_path), None, item.obj_type, item.seed)
+                        job.batch = True
+                        job.status = "FAILED"
+                        job.reason = f"could not load image {item.image_path}"
+                        continue
+                job = self.new_job(item.prompt, image, item.obj_type, item.seed)
+                job.batch = True
+
+            try:
+                self.submit_job(job)
+            except Exception as e:
+                job.status = "FAILED"
+                job.reason = str(e)
+            in_flight += 1
+
+    def batch_delay(self):
+        """Seconds until the batch can submit again, None if it is waiting on jobs or has nothing left."""
+        batch = _batch_queue
+        if batch is None or not batch.has_pending():
+            return None
+        if sum(job.batch and job.status == "RUNNING" for job in self.jobs) >= batch.max_in_flight:
+            return None
+        return batch.bucket.delay()
+
+    def batch_stats(self):
+        """(batch queue, failed job count) of the current batch, or None."""
+        if _batch_queue is None:
+            return None
+        failed = sum(job.batch and job.status == "FAILED" for job in self.jobs)
+        return _batch_queue, failed
 
-            if not _job_manager_timer_registred:
-                bpy.app.timers.register(job_manager_timer_callback)
-                _job_manager_timer_registred = True
+    def restart_job(self, id):
+        job = self.get_job(id)
+        if job is None:
+            return
 
-            print(f"Job added: {job.id}")
+        _job_resubmits.pop(job.id, None)
+        job.rate_limited = 0
+        try:
+            self.submit_job(job)
         except Exception as e:
             job.status = "FAILED"
             job.reason = str(e)
 
-    def restart_job(self, id):
-        global _job_manager_timer_registred
-        restarted = False
+    def submit_job(self, job):
+        """Queues the add task request for `job` on the gateway worker, or imports a cached result."""
+        # Temporary local ID for UI actions before submit, replaced with gateway task ID on success.
+        job.id = str(uuid.uuid4())
+        job.crtime = time.time()
+        job.status = "RUNNING"
+        job.reason = ""
+        job.cache_key = ""
+
+        _register_timer()
+
+        prefs = get_preferences()
+        # Hashed once per image until it changes, restarts and batch rows reuse it
+        pixel_hash = image_pixel_hash(job.image) if job.image else None
+
+        # Only fixed seeds give reproducible results
+        if job.seed != -1 and prefs.use_result_cache:
+            job.cache_key = cache_key(
+                "" if job.image else job.prompt,
+                pixel_hash,
+                GatewayApi.model_for(job.obj_type),
+                job.seed,
+            )
+            data = get_result_cache().get(job.cache_key, RESULT_SUFFIXES[job.obj_type])
+            if data is not None:
+                print(f"Job served from cache: {job.cache_key}")
+                profile = _replace_profile(job.id, new_import_profile(job.name))
+                result = result_decoder(job.obj_type, profile)()
+                result.feed(data)
+                self.import_result(job, result.finish())
+                return
+
+        if job.image:
+            # Pixels can only be read on the main thread, the upload runs on the worker
+            image = encode_image(job.image, pixel_hash, prefs.upload_format, prefs.upload_max_edge, prefs.upload_quality)
+            get_worker().submit_image(get_gateway(), job.id, image, job.obj_type, job.seed)
+        else:
+            get_worker().submit_text(get_gateway(), job.id, job.prompt, job.obj_type, job.seed)
+
+    def get_job(self, id):
         for job in self.jobs:
             if job.id == id:
-                try:
-                    if job.image:
-                        task = get_gateway().add_image_task(
-                            job.image, job.obj_type, job.seed
-                        )
-                    else:
-                        task = get_gateway().add_text_task(
-                            job.prompt, job.obj_type, job.seed
-                        )
-                    job.id = task.id
-                    job.crtime = time.time()
-                    job.status = "RUNNING"
-                    job.reason = ""
-                    restarted = True
-                except Exception as e:
-                    job.status = "FAILED"
-                    job.reason = str(e)
-                break
-
-        if restarted and not _job_manager_timer_registred:
-            bpy.app.timers.register(job_manager_timer_callback)
-            _job_manager_timer_registred = True
+                return job
+        return None
 
     def remove_job(self, id):
+        steps = _job_imports.pop(id, None)
+        if steps is not None:
+            steps.close()
+        _job_downloads.pop(id, None)
+        _job_resubmits.pop(id, None)
+        close_profile(_job_profiles.pop(id, None))
+        _poll_scheduler.remove(id)
+
         for i, job in enumerate(self.jobs):
             if job.id == id:
                 self.jobs.remove(i)
@@ -172,42 +376,159 @@ class JobManager(bpy.types.PropertyGroup):
                 job.reason = "connection timed out"
                 return
 
-            response = get_gateway().get_status(job.id)
+            on_result = None
+            if job.cache_key:
+                cache, key, suffix = get_result_cache(), job.cache_key, RESULT_SUFFIXES[job.obj_type]
+                on_result = lambda data: cache.put(key, suffix, data)
 
-            if response.status == GatewayTaskStatus.SUCCESS:
-                if job.obj_type == "3DGS":
-                    spz_data = get_gateway().get_result(job.id)
-                    ply_data = BytesIO(
-                        get_spz().decompress(spz_data, include_normals=False)
-                    )
-                    obj = import_gs(ply_data, job.name)
+            # Replaced on every poll, only the one of the poll that gets the result is used
+            profile = _replace_profile(job.id, new_import_profile(job.name))
+            get_worker().poll(get_gateway(), job.id, result_decoder(job.obj_type, profile), on_result)
+        except Exception as e:
+            job.status = "FAILED"
+            job.reason = str(e)
 
-                else:
-                    glb_data = get_gateway().get_result(job.id)
-                    obj = import_glb(glb_data, job.name)
+    def handle_message(self, message):
+        job = self.get_job(message.job_id)
+        if job is None:
+            # Removed while its request was in flight
+            return
 
-                if job.replace_obj:
-                    align_and_fit(job.replace_obj, obj)
-                    bpy.data.objects.remove(job.replace_obj, do_unlink=True)
-                    job.replace_obj = None
+        if message.kind != GatewayMessageKind.PROGRESS:
+            _job_downloads.pop(job.id, None)
+        if message.kind not in (GatewayMessageKind.PROGRESS, GatewayMessageKind.RESULT):
+            # The poll's profile won't import anything, a failed download may have left it tracing
+            close_profile(_job_profiles.pop(job.id, None))
 
-                job.status = "COMPLETED"
-                self.remove_job(job.id)
-            elif response.status == GatewayTaskStatus.FAILURE:
-                job.status = "FAILED"
-                job.reason = response.reason or "generation failed"
+        try:
+            if message.kind == GatewayMessageKind.SUBMITTED:
+                job.id = message.payload.id
+                job.rate_limited = 0
+                _poll_scheduler.schedule(job.id)
+                if job.batch and _batch_queue is not None:
+                    _batch_queue.bucket.accepted()
+                print(f"Job added: {job.id}")
+            elif message.kind == GatewayMessageKind.STATUS:
+                status = message.payload.status
+                if status == GatewayTaskStatus.FAILURE:
+                    job.status = "FAILED"
+                    job.reason = message.payload.reason or "generation failed"
+                elif status == GatewayTaskStatus.PARTIAL_RESULT:
+                    _poll_scheduler.progressed(job.id)
+                else:
+                    _poll_scheduler.backoff(job.id)
+            elif message.kind == GatewayMessageKind.PROGRESS:
+                received, total = message.payload
+                _job_downloads[job.id] = message.payload
+                job.progress = min(received / total, 1.0) if total else 0.0
+            elif message.kind == GatewayMessageKind.RESULT:
+                _poll_scheduler.remove(job.id)
+                self.import_result(job, message.payload)
+            elif isinstance(message.payload, GatewayAddTaskError):
+                if job.batch and _batch_queue is not None and message.payload.retry_after is not None:
+                    # Rate limited, resubmitted once the token bucket allows
+                    _batch_queue.rate_limited(job.id, message.payload.retry_after)
+                    job.status = "WAITING"
+                    job.reason = "rate limited, waiting to resubmit"
+                elif message.payload.retry_after is not None and job.rate_limited < get_preferences().request_retries:
+                    # Waited out here rather than on a worker thread, which would hold up every other request
+                    job.rate_limited += 1
+                    _job_resubmits[job.id] = time.monotonic() + max(message.payload.retry_after, PollScheduler.MIN_INTERVAL)
+                    job.status = "WAITING"
+                    job.reason = "rate limited, waiting to resubmit"
+                else:
+                    raise message.payload
+            elif getattr(message.payload, "retry_after", None) is not None:
+                # Rate limited while polling, try again later instead of failing
+                if message.payload.retry_after > 0:
+                    _poll_scheduler.retry_after(job.id, message.payload.retry_after)
+                else:
+                    _poll_scheduler.backoff(job.id)
+            else:
+                raise message.payload
+        except Exception as e:
+            job.status = "FAILED"
+            job.reason = str(e)
+
+    def import_result(self, job, result):
+        """Imports what the `result_decoder` of the job returned."""
+        if job.obj_type == "3DGS":
+            # Imported in chunks over the next timer ticks, see step_import
+            _job_imports[job.id] = import_gs_steps(result, job.name, profile=_job_profiles.get(job.id), options=import_options())
+            job.progress = 0.0
+        else:
+            obj = import_glb(result, job.name)
+            self.complete_job(job, obj)
+
+    def step_import(self, job):
+        try:
+            job.progress = next(_job_imports[job.id])
+        except StopIteration as done:
+            del _job_imports[job.id]
+            self.complete_job(job, done.value)
         except Exception as e:
+            del _job_imports[job.id]
             job.status = "FAILED"
             job.reason = str(e)
 
+    def complete_job(self, job, obj):
+        if job.replace_obj:
+            align_and_fit(job.replace_obj, obj)
+            bpy.data.objects.remove(job.replace_obj, do_unlink=True)
+            job.replace_obj = None
+
+        job.status = "COMPLETED"
+        if job.batch and _batch_queue is not None:
+            _batch_queue.completed += 1
+        self.remove_job(job.id)
+
     def update(self):
+        for message in get_worker().drain():
+            self.handle_message(message)
+
+        self.feed_batch()
+        self.resubmit_due()
+
         for job in list(self.jobs):
-            self.update_job(job)
+            if job.id in _job_imports:
+                self.step_import(job)
+
+        # Only jobs whose poll deadline passed are touched
+        for id in _poll_scheduler.pop_due():
+            job = self.get_job(id)
+            if job is not None:
+                self.update_job(job)
+
+    def resubmit_due(self):
+        """Submits rate limited jobs again whose Retry-After passed."""
+        now = time.monotonic()
+        for id in [id for id, due in _job_resubmits.items() if due <= now]:
+            del _job_resubmits[id]
+            job = self.get_job(id)
+            if job is None:
+                continue
+            try:
+                self.submit_job(job)
+            except Exception as e:
+                job.status = "FAILED"
+                job.reason = str(e)
 
     def has_jobs(self):
         return len(self.jobs) > 0
 
+    def has_importing_jobs(self):
+        return any(job.id in _job_imports for job in self.jobs)
+
+    def is_importing(self, job):
+        return job.id in _job_imports
+
+    def download_progress(self, job):
+        """(bytes received, total bytes or None) while the result of `job` downloads, else None."""
+        return _job_downloads.get(job.id)
+
     def has_active_jobs(self):
+        if _batch_queue is not None and _batch_queue.has_pending():
+            return True
         return any(job.status in {'RUNNING', 'WAITING'} for job in self.jobs)
 
 
@@ -256,6 +577,19 @@ def register():
 
 
 def unregister():
+    global _batch_queue
+    _batch_queue = None
+    for steps in _job_imports.values():
+        steps.close()
+    _job_imports.clear()
+    _job_downloads.clear()
+    _job_resubmits.clear()
+    for profile in _job_profiles.values():
+        profile.close()
+    _job_profiles.clear()
+    _poll_scheduler.clear()
+    shutdown_worker()
+
     del bpy.types.WindowManager.threegen
 
     for cls in reversed(classes):
@@ -5,9 +5,16 @@ from __future__ import annotations
 import ctypes
 import ctypes.util
 import platform
+import weakref
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
+
+from .util import profiling
+from .util.ply import BufferReader
+from .util.spz import SpzStreamDecoder
+
 
 class SPZError(RuntimeError):
     pass
@@ -103,44 +110,64 @@ class SPZLoader:
 
     def decompress(self, data: bytes, include_normals: bool = False) -> bytes:
         """Decompress `data` using the loaded SPZ library."""
-        if not isinstance(data, (bytes, bytearray)):
-            raise TypeError("data must be bytes or bytearray")
+        out_ptr, size = self._decompress_native(data, include_normals)
+        try:
+            return ctypes.string_at(out_ptr, size) if size > 0 else b""
+        finally:
+            self._free(out_ptr)
+
+    def decompress_buffer(self, data: bytes, include_normals: bool = False) -> memoryview:
+        """Decompress `data` without copying the output.
+
+        Returns a read-only view of the native output buffer. The buffer is
+        released through `free_buffer_spz` once the view and everything
+        created from it (e.g. `np.frombuffer` arrays) are gone.
+        """
+        out_ptr, size = self._decompress_native(data, include_normals)
+        if size <= 0:
+            self._free(out_ptr)
+            return memoryview(b"")
 
-        input_buf = ctypes.create_string_buffer(data)
-        input_ptr = ctypes.cast(input_buf, ctypes.c_void_p)
+        addr = ctypes.cast(out_ptr, ctypes.c_void_p).value
+        native = (ctypes.c_uint8 * size).from_address(addr)
+        weakref.finalize(native, self._free, out_ptr)
+        return memoryview(native).cast("B").toreadonly()
+
+    def _decompress_native(self, data, include_normals: bool):
+        """Run `decompress_spz` on any contiguous bytes-like `data`, passed by pointer.
+
+        Returns the native output pointer and size; the caller must free it.
+        """
+        try:
+            input_arr = np.frombuffer(data, dtype=np.uint8)
+        except (TypeError, ValueError) as e:
+            raise TypeError("data must be a contiguous bytes-like object") from e
+        if input_arr.size > 0x7FFFFFFF:
+            raise SPZError("input is too large for decompress_spz")
 
         out_ptr = ctypes.POINTER(ctypes.c_uint8)()
         out_size = ctypes.c_int(0)
 
         res = self._lib.decompress_spz(
-            input_ptr,
-            ctypes.c_int(len(data)),
+            input_arr.ctypes.data_as(ctypes.c_void_p),
+            ctypes.c_int(input_arr.size),
             ctypes.c_int(1 if include_normals else 0),
             ctypes.byref(out_ptr),
             ctypes.byref(out_size),
         )
 
         if res != 0:
-            try:
-                if out_ptr and bool(out_ptr.value):
-                    self._lib.free_buffer_spz(out_ptr)
-            except Exception:
-                pass
+            self._free(out_ptr)
             raise SPZError(f"decompress failed ({res}): {self._get_error_message(res)}")
 
-        size = int(out_size.value)
-        if size <= 0:
-            try:
-                self._lib.free_buffer_spz(out_ptr)
-            except Exception:
-                pass
-            return b""
-
-        addr = ctypes.cast(out_ptr, ctypes.c_void_p).value
-        result = ctypes.string_at(addr, size)
+        return out_ptr, int(out_size.value)
 
-        self._lib.free_buffer_spz(out_ptr)
-        return result
+    def _free(self, out_ptr) -> None:
+        try:
+            if out_ptr:
+                self._lib.free_buffer_spz(out_ptr)
+        except Exception:
+            pass
 
 
 def _get_error_message(code: int) -> str:
@@ -156,6 +183,49 @@ def decompress(data: bytes, include_normals: bool = False) -> bytes:
     return get_spz().decompress(data, include_normals)
 
 
+class _NativeSplatDecoder:
+    """Collects the whole SPZ stream and decodes it with the native library in `finish`."""
+
+    def __init__(self, profile=None) -> None:
+        self._profile = profile
+        self._data = bytearray()
+
+    def feed(self, chunk) -> None:
+        self._data += chunk
+
+    def finish(self):
+        with profiling.span(self._profile, "spz decompress", 0):
+            return BufferReader(get_spz().decompress_buffer(self._data, include_normals=False))
+
+
+def splat_decoder(decoder: str = "AUTO", profile=None):
+    """Returns an incremental SPZ decoder: `feed` it chunks, then `finish` returns
+    something `import_gs_steps` accepts.
+
+    With the native decoder that is a reader over the decompressed PLY; with the
+    built-in NumPy decoder, which decodes while chunks arrive, it is the column
+    dict itself. `decoder` is one of "AUTO", "NATIVE" or "BUILTIN"; "AUTO" falls
+    back to the built-in decoder when the native library can't be loaded.
+    Decoding time is recorded in `profile`, an optional ImportProfile.
+    """
+    if decoder != "BUILTIN":
+        try:
+            get_spz()
+            return _NativeSplatDecoder(profile)
+        except OSError as e:
+            if decoder == "NATIVE":
+                raise
+            print(f"Native SPZ decoder unavailable, using built-in decoder: {e}")
+    return SpzStreamDecoder(profile)
+
+
+def load_splats(data: bytes, decoder: str = "AUTO"):
+    """Decode SPZ `data` at once, see `splat_decoder`."""
+    splats = splat_decoder(decoder)
+    splats.feed(data)
+    return splats.finish()
+
+
 __all__ = ["SPZLoader", "SPZError"]
 
 # SPZ global loader instance
@@ -2,6 +2,7 @@ import bpy
 from bpy.types import Context, Panel, UILayout
 
 from .import ops
+from .util.profiling import get_profiles
 
 job_status_icon = {
     'COMPLETED': 'CHECKMARK',
@@ -27,6 +28,16 @@ class THREEGEN_PT_MainPanel(Panel):
         subrow.enabled = job.status == 'FAILED'
         op = row.operator(ops.RemoveJobOperator.bl_idname, text="", icon="TRASH")
         op.job_id = job.id
+        job_manager = context.window_manager.threegen.job_manager
+        download = job_manager.download_progress(job)
+        if job_manager.is_importing(job):
+            row = col.row()
+            row.progress(factor=job.progress, type="BAR", text="Importing")
+        elif download is not None:
+            received, total = download
+            text = f"Downloading {received / 2**20:.1f}" + (f" / {total / 2**20:.1f} MB" if total else " MB")
+            row = col.row()
+            row.progress(factor=job.progress, type="BAR", text=text)
         if job.reason:
             row = col.row()
             row.label(text=job.reason)
@@ -70,11 +81,30 @@ class THREEGEN_PT_MainPanel(Panel):
         row.prop(threegen, "include_placeholder_dims", text="Include placeholder size")
         if not threegen.replace_active_obj:
             row.enabled = False  
-        row = layout.row()
+        row = layout.row(align=True)
         row.operator(ops.GenerateOperator.bl_idname)
+        row.operator(ops.BatchGenerateOperator.bl_idname, text="", icon="FILE_TEXT")
+        self.draw_batch(context, layout)
         row = layout.row()
         self.draw_job_list(context, row)
 
+    def draw_batch(self, context:Context, layout:UILayout):
+        stats = context.window_manager.threegen.job_manager.batch_stats()
+        if stats is None:
+            return
+
+        batch, failed = stats
+        done = batch.completed + failed
+        text = f"Batch {done}/{batch.total}, {batch.jobs_per_minute():.1f} jobs/min"
+        eta = batch.eta(failed)
+        if done < batch.total and eta is not None:
+            minutes, seconds = divmod(int(eta), 60)
+            text += f", ETA {minutes}:{seconds:02d}"
+        row = layout.row(align=True)
+        row.progress(factor=done / batch.total if batch.total else 1.0, type="BAR", text=text)
+        icon = "CANCEL" if batch.has_pending() else "X"
+        row.operator(ops.CancelBatchOperator.bl_idname, text="", icon=icon)
+
 
 class THREEGEN_PT_DisplaySettingsPanel(Panel):
     bl_space_type = "VIEW_3D"
@@ -102,6 +132,11 @@ class THREEGEN_PT_DisplaySettingsPanel(Panel):
         row = layout.row()
         row.prop(obj.modifiers["Gaussian Splatting"], '["Socket_3"]', text="Display Percentage")
 
+        col = layout.column(align=True)
+        col.operator(ops.SelectRegionOperator.bl_idname, icon="RESTRICT_SELECT_OFF")
+        col.operator(ops.CropToBoundsOperator.bl_idname, icon="MOD_BOOLEAN")
+        col.operator(ops.DeleteOutsideRadiusOperator.bl_idname, icon="SPHERE")
+
 
 
 class THREEGEN_PT_SocialPanel(Panel):
@@ -133,13 +168,54 @@ class THREEGEN_PT_IOPanel(Panel):
         layout = self.layout
         row = layout.row()
         row.operator(ops.ImportOperator.bl_idname, text="Import 3DGS PLY")
+        row = layout.row()
+        row.operator(ops.ExportOperator.bl_idname, text="Export 3DGS PLY")
+
+
+
+class THREEGEN_PT_ProfilePanel(Panel):
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "404"
+    bl_idname = "THREEGEN_PT_ProfilePanel"
+    bl_label = "Import Profiles"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    # Most recent profiles drawn, the export has all of them
+    MAX_DRAWN = 5
+
+    def draw(self, context: Context):
+        layout = self.layout
+        profiles = get_profiles()
+
+        row = layout.row(align=True)
+        row.operator(ops.ExportProfilesOperator.bl_idname, text="Export JSON", icon="EXPORT")
+        row.operator(ops.ClearProfilesOperator.bl_idname, text="", icon="TRASH")
+        if not profiles:
+            layout.label(text="No imports profiled yet")
+            return
 
+        for profile in profiles[:self.MAX_DRAWN]:
+            box = layout.box()
+            box.label(text=f"{profile.name}: {profile.count:,} splats in {profile.total_seconds():.2f} s")
+            col = box.column(align=True)
+            for stat, value in profile.stats.items():
+                row = col.row()
+                row.label(text=stat)
+                row.label(text=f"{value:,}")
+            for span in profile.spans.values():
+                row = col.row()
+                row.label(text=span.name)
+                row.label(text=f"{span.seconds * 1000:.1f} ms")
+                if span.peak_bytes is not None:
+                    row.label(text=f"{span.peak_bytes / 2**20:.1f} MB")
 
 
 classes = (
     THREEGEN_PT_MainPanel,
     THREEGEN_PT_DisplaySettingsPanel,
     THREEGEN_PT_IOPanel,
+    THREEGEN_PT_ProfilePanel,
     THREEGEN_PT_SocialPanel,
 )
 
@@ -0,0 +1,157 @@
+import numpy as np
+
+from .spatial import morton_codes
+
+# Share of the budget MERGE keeps as the most important splats, the rest is voxel merged
+MERGE_KEEP_FRACTION = 0.5
+
+# Equally sized importance bands `importance_order` sorts splats into, one per 10% of them
+IMPORTANCE_BANDS = 10
+
+# Resolution refinements MERGE tries to fit the voxel budget
+MAX_VOXEL_ITERATIONS = 8
+
+
+def splat_importance(opacity, scale):
+    """Opacity times projected footprint of every splat, from processed (activated) attributes.
+
+    The footprint is that of a sphere of the same volume as the splat's
+    ellipsoid, so flat and round splats of equal volume rank alike.
+    """
+    volume = np.asarray(scale, dtype=np.float32).reshape(-1, 3).prod(axis=1)
+    return np.asarray(opacity, dtype=np.float32) * np.cbrt(volume) ** 2
+
+
+def decimate(xyz, attributes, max_splats: int, method: str = "TOP"):
+    """Reduces flat positions and processed attributes to at most `max_splats` splats.
+
+    TOP keeps the most important splats. MERGE keeps the most important part
+    of the budget as is and merges the remaining splats voxel by voxel into
+    the rest of it. Kept splats stay in their original order.
+    Returns the new positions and attributes, or the inputs unchanged if they fit.
+    """
+    count = len(xyz) // 3
+    if max_splats <= 0 or count <= max_splats:
+        return xyz, attributes
+
+    importance = splat_importance(attributes["opacity"], attributes["scale"])
+    if method == "TOP":
+        return _gather(xyz, attributes, _top(importance, max_splats))
+    if method != "MERGE":
+        raise ValueError(f"Unknown decimation method: {method}")
+
+    keep_count = int(max_splats * MERGE_KEEP_FRACTION)
+    keep = _top(importance, keep_count)
+    rest = np.ones(count, dtype=bool)
+    rest[keep] = False
+    rest = np.flatnonzero(rest)
+
+    kept_xyz, kept = _gather(xyz, attributes, keep)
+    merged_xyz, merged = _voxel_merge(*_gather(xyz, attributes, rest), importance[rest], max_splats - keep_count)
+    return (
+        np.concatenate([kept_xyz, merged_xyz]),
+        {key: np.concatenate([kept[key], merged[key]]) for key in attributes},
+    )
+
+
+def importance_order(xyz, attributes, bands: int = IMPORTANCE_BANDS):
+    """Splat order by descending importance band, and along a Morton curve within each band.
+
+    Any leading part of the reordered splats holds the most important ones,
+    spread over the whole object, so drawing only the first few percent
+    still shows its shape. Neighbours in the order are mostly neighbours in
+    space, which keeps the node tree's memory access local.
+    """
+    importance = splat_importance(attributes["opacity"], attributes["scale"])
+    # Band 0 holds the most important splats; quantiles need no full sort
+    thresholds = np.quantile(importance, np.linspace(1.0, 0.0, bands + 1)[1:-1])
+    band = np.searchsorted(-thresholds, -importance, side="right").astype(np.uint64)
+    # The band above 19 bits per axis of Morton code, so one sort of one key does both
+    return np.argsort((band << np.uint64(57)) | morton_codes(xyz, 19))
+
+
+def reorder(xyz, attributes):
+    """Positions and attributes rearranged by `importance_order`."""
+    return _gather(xyz, attributes, importance_order(xyz, attributes))
+
+
+def _top(importance, n: int):
+    if n <= 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(importance, len(importance) - n)[len(importance) - n:]
+    top.sort()
+    return top
+
+
+def _gather(xyz, attributes, indices):
+    count = len(xyz) // 3
+    return (
+        xyz.reshape(count, -1)[indices].reshape(-1),
+        {key: values.reshape(count, -1)[indices].reshape(-1) for key, values in attributes.items()},
+    )
+
+
+def _voxel_cells(co, max_cells: int):
+    """Voxel index of every point on the finest grid found with at most `max_cells` occupied voxels."""
+    lo = co.min(axis=0)
+    extent = float((co.max(axis=0) - lo).max()) or 1.0
+
+    # A grid of at most `max_cells` voxels always fits, finer ones are tried from there
+    best = None
+    fits, too_fine = max(int(np.cbrt(max_cells)), 1), 2**20
+    resolution = fits
+    for _ in range(MAX_VOXEL_ITERATIONS):
+        cell = np.minimum(((co - lo) * (resolution / extent)).astype(np.int64), resolution - 1)
+        keys = (cell[:, 0] * resolution + cell[:, 1]) * resolution + cell[:, 2]
+        occupied, inverse = np.unique(keys, return_inverse=True)
+        if len(occupied) > max_cells:
+            too_fine = resolution
+        else:
+            fits, best = resolution, inverse
+            if len(occupied) == len(co) or len(occupied) > 0.95 * max_cells:
+                break
+
+        if too_fine < 2**20:
+            resolution = (fits + too_fine) // 2
+        else:
+            # Occupancy of splat clouds grows roughly with the surface, i.e. the square of the resolution
+            resolution = int(resolution * max(np.sqrt(max_cells / len(occupied)), 1.1))
+        if resolution in (fits, too_fine):
+            break
+    return best
+
+
+def _voxel_merge(xyz, attributes, importance, max_splats: int):
+    """Merges splats sharing a voxel into one, on the finest grid with at most `max_splats` voxels.
+
+    The merged splat takes the rotation of its most important member, the
+    importance weighted mean position and color, the highest opacity, and
+    scales grown so its volume is the total volume of the members.
+    """
+    count = len(xyz) // 3
+    if count == 0 or max_splats <= 0:
+        return _gather(xyz, attributes, np.empty(0, dtype=np.intp))
+
+    cells = _voxel_cells(xyz.reshape(-1, 3), max_splats)
+
+    # Members of a voxel become contiguous, most important first
+    order = np.lexsort((-importance, cells))
+    starts = np.flatnonzero(np.r_[True, cells[order[1:]] != cells[order[:-1]]])
+    top = order[starts]
+
+    weights = np.maximum(importance[order], np.finfo(np.float32).tiny).astype(np.float64)
+    total_weight = np.add.reduceat(weights, starts)
+
+    def weighted_mean(values):
+        values = values.reshape(count, -1)[order]
+        return (np.add.reduceat(values * weights[:, None], starts) / total_weight[:, None]).astype(np.float32).reshape(-1)
+
+    scale = attributes["scale"].reshape(count, 3)
+    volume = scale.prod(axis=1).astype(np.float64)
+    growth = np.cbrt(np.add.reduceat(volume[order], starts) / np.maximum(volume[top], np.finfo(np.float64).tiny))
+
+    _, merged = _gather(xyz, attributes, top)
+    merged["f_dc"] = weighted_mean(attributes["f_dc"])
+    merged["opacity"] = np.maximum.reduceat(attributes["opacity"][order], starts)
+    merged["scale"] = (scale[top] * growth[:, None]).astype(np.float32).reshape(-1)
+    return weighted_mean(xyz), merged
@@ -1,98 +1,319 @@
 import bpy
-from mathutils import Quaternion, Euler, Vector
 import math
-import time
+import numpy as np
 import os
+from typing import NamedTuple
 
 # from .plyfile import PlyData
-from .ply import read_custom_ply
+from .decimation import decimate, reorder
+from .disk_cache import DiskCache, cache_key
+from .ply import iter_ply_chunks, read_ply_header, write_custom_ply
+from .profiling import ImportProfile
 
 RECOMMENDED_MAX_GAUSSIANS = 200_000
 
 
-def import_gs(filepath: str, name: str):
+# Culling is opt in, imports keep every splat of the source unless asked otherwise.
+# One step of 8 bit alpha, 1 / 255, is a good value to opt in with: splats below it don't visibly contribute.
+DEFAULT_MIN_OPACITY = 0.0
 
-    if "GaussianSplatting" not in bpy.data.node_groups:
-        script_file = os.path.realpath(__file__)
-        path = os.path.dirname(script_file)
-        blendfile = os.path.join(path, "gs_nodetree.blend")
-        section = "/NodeTree/"
-        object = "GaussianSplatting"
+# Splats read and transformed per step by the chunked importer
+DEFAULT_CHUNK_SIZE = 250_000
 
-        directory = blendfile + section
-        filename = object
+# Raw column -> values per splat
+COLUMN_WIDTHS = {"xyz": 3, "f_dc": 3, "opacity": 1, "scale": 3, "rot": 4}
 
-        bpy.ops.wm.append(filename=filename, directory=directory)
+# Processed attribute -> (mesh attribute, type, foreach_set key, floats per splat)
+SPLAT_ATTRIBUTES = {
+    "f_dc": ("diffuse_color", "FLOAT_VECTOR", "vector", 3),
+    "scale": ("scale", "FLOAT_VECTOR", "vector", 3),
+    "opacity": ("opacity", "FLOAT", "value", 1),
+    "rot": ("rot_euler", "FLOAT_VECTOR", "vector", 3),
+}
 
-    start_time_0 = time.time()
-    start_time = time.time()
 
-    data = read_custom_ply(filepath)
-    data = process_attributes(data)
-    print(f"Processed {data['count']} splats")
-    print(len(data["xyz"])/3)
-    assert(data['count'] == len(data["xyz"])/3 )
-    assert(data['count'] == len(data["opacity"]) )
-    assert(data['count'] == len(data["scale"])/3 )
-    assert(data['count'] == len(data["rot"])/3 )
+class ImportOptions(NamedTuple):
+    """How splats are reduced on import, part of the import cache key."""
 
+    # Splats kept at most, 0 keeps all of them
+    max_splats: int = 0
+    # "TOP" or "MERGE", see `decimate`
+    decimation: str = "TOP"
+    # Splats with a lower (activated) opacity are dropped while reading
+    min_opacity: float = 0.0
+    # Most important splats first, see `importance_order`, so a low Display Percentage previews them
+    reorder: bool = True
 
-    print(f"PLY loaded in {time.time() - start_time} seconds")
 
-    start_time = time.time()
-    
-    mesh = bpy.data.meshes.new(name="Mesh")
-    mesh.from_pydata([(data["xyz"][i], data["xyz"][i+1], data["xyz"][i+2]) for i in range(0, len(data["xyz"]), 3)], [], [])
-    mesh.update()
+# Bumped whenever the processing or layout of cached attributes changes
+CACHE_FORMAT_VERSION = 1
+CACHE_SUFFIX = ".npy"
+# Positions plus the processed attributes
+CACHED_FLOATS_PER_SPLAT = 3 + sum(width for _, _, _, width in SPLAT_ATTRIBUTES.values())
+
+
+def import_gs(data, name: str, chunk_size: int = DEFAULT_CHUNK_SIZE, profile: ImportProfile | None = None, options: ImportOptions | None = None, cache: DiskCache | None = None, cache_key: str = ""):
+    """Imports splats from a file-like PLY or a decoded column dict in one blocking call."""
+    steps = import_gs_steps(data, name, chunk_size, profile, options, cache, cache_key)
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
 
-    print("Mesh loaded in", time.time() - start_time, "seconds")
+def import_gs_steps(data, name: str, chunk_size: int = DEFAULT_CHUNK_SIZE, profile: ImportProfile | None = None, options: ImportOptions | None = None, cache: DiskCache | None = None, cache_key: str = ""):
+    """Imports splats in steps of at most `chunk_size` splats.
 
-    start_time = time.time()
+    `data` is either a file-like PLY or a dict of raw columns as returned by
+    `read_custom_ply` or `read_spz`.
 
-    mesh.attributes.new(name="diffuse_color", type='FLOAT_VECTOR', domain='POINT').data.foreach_set("vector", data["f_dc"])
-    mesh.attributes.new(name="scale", type='FLOAT_VECTOR', domain='POINT').data.foreach_set("vector", data["scale"])
-    mesh.attributes.new(name="opacity", type='FLOAT', domain='POINT').data.foreach_set("value", data["opacity"])
-    mesh.attributes.new(name="rot_euler", type='FLOAT_VECTOR', domain='POINT').data.foreach_set("vector", data["rot"])
+    Yields the progress as a fraction in [0, 1] after each step and returns the new object.
+    Closing the generator early cancels the import and removes any partially built mesh.
+    Each stage is timed as a span of `profile`, which is kept in the recent
+    profiles once the import completes; a new profile is made if none is given.
+
+    `options` reduce the splats before the mesh is built, the counts before
+    and after end up in the stats of `profile`.
+
+    With a `cache`, the processed attributes are stored under `cache_key`
+    (see `import_cache_key`), and later imports with the same key map them
+    from the cache instead of reading `data` at all.
+    """
+    if profile is None:
+        profile = ImportProfile(name)
+    try:
+        return (yield from _import_gs_steps(data, name, chunk_size, profile, options or ImportOptions(), cache, cache_key))
+    finally:
+        # Cancelled or failed imports never reach finish(), which would stop memory tracing
+        profile.close()
+
+
+def _import_gs_steps(data, name: str, chunk_size: int, profile: ImportProfile, options: ImportOptions, cache: DiskCache | None, cache_key: str):
+    ensure_node_group()
+
+    cached = None
+    if cache is not None:
+        with profile.span("cache load"):
+            cached = load_cached_attributes(cache, cache_key)
+            if cached is not None:
+                profile.count = len(cached[0]) // 3
+
+    if cached is not None:
+        xyz, attributes = cached
+        count = profile.count
+        yield 0.8
+    else:
+        xyz, attributes = yield from read_attributes(data, chunk_size, profile, options.min_opacity)
+
+        if options.max_splats and profile.count > options.max_splats:
+            with profile.span("decimation"):
+                xyz, attributes = decimate(xyz, attributes, options.max_splats, options.decimation)
+                profile.count = len(xyz) // 3
+        count = profile.count
+
+        if options.reorder and count:
+            with profile.span("reorder"):
+                xyz, attributes = reorder(xyz, attributes)
+
+        # The new object has an identity matrix, so the pivot can be moved before upload
+        with profile.span("pivot"):
+            move_pivot_to_bottom_array(xyz)
+
+        if cache is not None:
+            with profile.span("cache write"):
+                store_cached_attributes(cache, cache_key, xyz, attributes)
+
+    mesh = bpy.data.meshes.new(name="Mesh")
+    try:
+        with profile.span("mesh creation"):
+            mesh.vertices.add(count)
+            mesh.vertices.foreach_set("co", xyz)
+            mesh.update()
+            del xyz
+        yield 0.85
+
+        # foreach_set can't write slices, so each attribute is uploaded in one call per step
+        for i, (key, (attr_name, attr_type, prop, _)) in enumerate(SPLAT_ATTRIBUTES.items()):
+            with profile.span("attribute upload"):
+                mesh.attributes.new(name=attr_name, type=attr_type, domain='POINT').data.foreach_set(prop, attributes.pop(key))
+            yield 0.85 + 0.15 * (i + 1) / len(SPLAT_ATTRIBUTES)
+    except GeneratorExit:
+        bpy.data.meshes.remove(mesh)
+        raise
 
     obj = bpy.data.objects.new(name, mesh)
     bpy.context.collection.objects.link(obj)
     # bpy.context.view_layer.objects.active = obj
     # obj.select_set(True)
-    move_pivot_to_bottom(obj)
-
-    print("Mesh attributes added in", time.time() - start_time, "seconds")
 
-    setup_nodes(obj)
+    with profile.span("node setup"):
+        setup_nodes(obj)
 
-    print("Total Processing time: ", time.time() - start_time_0)
+    # Evaluated here rather than on the next redraw so its cost shows up in the profile
+    with profile.span("node evaluation"):
+        bpy.context.view_layer.update()
 
+    profile.finish()
     return obj
 
 
+def read_attributes(data, chunk_size: int, profile: ImportProfile, min_opacity: float = 0.0):
+    """Reads and processes all splats of `data` chunk by chunk, yielding progress up to 0.8.
+
+    Splats with an opacity below `min_opacity` are dropped chunk by chunk.
+    Returns the flat positions and the processed attributes keyed like `SPLAT_ATTRIBUTES`,
+    sets the splat count of `profile` to the splats kept and records the source and culled counts in its stats.
+    """
+    if isinstance(data, dict):
+        count = data["count"]
+        chunks = iter_column_chunks(data, chunk_size)
+    else:
+        with profile.span("parse", 0):
+            header = read_ply_header(data)
+        count = header.count
+        chunks = iter_ply_chunks(data, header, chunk_size)
+    profile.count = count
+    profile.stats["source splats"] = count
+
+    # Outputs are sized once, so only one chunk of raw input is held at a time
+    xyz = np.empty(count * 3, dtype=np.float32)
+    attributes = {key: np.empty(count * width, dtype=np.float32) for key, (_, _, _, width) in SPLAT_ATTRIBUTES.items()}
+
+    read = done = 0
+    while True:
+        with profile.span("parse", 0) as span:
+            chunk = next(chunks, None)
+            if chunk is not None:
+                span.count += chunk["count"]
+        if chunk is None:
+            break
+        read += chunk["count"]
+
+        with profile.span("attribute transform", chunk["count"]):
+            chunk = process_attributes(chunk)
+            if min_opacity > 0.0:
+                chunk = cull_transparent(chunk, min_opacity)
+            end = done + chunk["count"]
+            xyz[done * 3:end * 3] = chunk["xyz"]
+            for key, (_, _, _, width) in SPLAT_ATTRIBUTES.items():
+                attributes[key][done * width:end * width] = chunk[key]
+        done = end
+        yield 0.8 * read / count if count else 0.8
+
+    if done < count:
+        # Leading slices of the flat arrays, still contiguous for foreach_set
+        xyz = xyz[:done * 3]
+        attributes = {key: values[:done * width] for (key, values), (_, _, _, width) in zip(attributes.items(), SPLAT_ATTRIBUTES.values())}
+        profile.count = done
+    profile.stats["culled splats"] = count - done
+    return xyz, attributes
+
+
+def cull_transparent(chunk, min_opacity: float):
+    """Processed `chunk` without the splats whose opacity is below `min_opacity`."""
+    keep = chunk["opacity"] >= min_opacity
+    kept = int(np.count_nonzero(keep))
+    if kept == chunk["count"]:
+        return chunk
+
+    culled = {"count": kept, "xyz": np.asarray(chunk["xyz"]).reshape(-1, 3)[keep].reshape(-1)}
+    for key, (_, _, _, width) in SPLAT_ATTRIBUTES.items():
+        culled[key] = chunk[key].reshape(-1, width)[keep].reshape(-1)
+    return culled
+
+
+def import_cache_key(path: str, options: ImportOptions | None = None) -> str:
+    """Cache key of the processed attributes of the file at `path`, imported with `options`.
+
+    The key changes whenever the file is modified, so stale entries are never
+    read; they age out of the cache instead.
+    """
+    stat = os.stat(path)
+    return cache_key("import", CACHE_FORMAT_VERSION, os.path.realpath(path), stat.st_size, stat.st_mtime_ns, list(options or ImportOptions()))
+
+
+def store_cached_attributes(cache: DiskCache, key: str, xyz, attributes) -> None:
+    """Writes positions and attributes as one flat float32 .npy, one block per array.
+
+    A single file per import keeps eviction all or nothing. Failing to write the
+    cache doesn't fail the import.
+    """
+    blocks = [xyz] + [attributes[key] for key in SPLAT_ATTRIBUTES]
+
+    def write(f):
+        header = {"descr": "<f4", "fortran_order": False, "shape": (sum(len(block) for block in blocks),)}
+        np.lib.format.write_array_header_1_0(f, header)
+        for block in blocks:
+            f.write(memoryview(np.ascontiguousarray(block, dtype="<f4")))
+
+    try:
+        cache.write(key, CACHE_SUFFIX, write)
+    except OSError as e:
+        print(f"Could not cache imported attributes: {e}")
+
+
+def load_cached_attributes(cache: DiskCache, key: str):
+    """Positions and attributes stored by `store_cached_attributes` as read-only views of the mapped file, or None."""
+    path = cache.get_path(key, CACHE_SUFFIX)
+    if path is None:
+        return None
+    try:
+        flat = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if flat.dtype != np.float32 or flat.ndim != 1 or len(flat) % CACHED_FLOATS_PER_SPLAT:
+        return None
+
+    count = len(flat) // CACHED_FLOATS_PER_SPLAT
+    xyz = flat[:count * 3]
+    attributes = {}
+    offset = count * 3
+    for key, (_, _, _, width) in SPLAT_ATTRIBUTES.items():
+        attributes[key] = flat[offset:offset + count * width]
+        offset += count * width
+    return xyz, attributes
+
+
+def iter_column_chunks(data, chunk_size: int):
+    """Yields views of consecutive runs of at most `chunk_size` splats from a column dict."""
+    count = data["count"]
+    chunk_size = max(chunk_size, 1)
+    for start in range(0, max(count, 1), chunk_size):
+        end = min(start + chunk_size, count)
+        chunk = {key: data[key][start * width:end * width] for key, width in COLUMN_WIDTHS.items()}
+        chunk["count"] = end - start
+        yield chunk
+
+
+def ensure_node_group():
+    if "GaussianSplatting" not in bpy.data.node_groups:
+        script_file = os.path.realpath(__file__)
+        path = os.path.dirname(script_file)
+        blendfile = os.path.join(path, "gs_nodetree.blend")
+        section = "/NodeTree/"
+        object = "GaussianSplatting"
+
+        directory = blendfile + section
+        filename = object
+
+        bpy.ops.wm.append(filename=filename, directory=directory)
+
+
 def setup_nodes(obj):
-    start_time = time.time()
     m = obj.modifiers.new(name="Gaussian Splatting", type="NODES")
     m.node_group = bpy.data.node_groups["GaussianSplatting"]
-    print("Geometry nodes created in", time.time() - start_time, "seconds")
 
 
 def process_attributes(data, euler_order="XYZ"):
-    xyz = data["xyz"]
-    scale = data["scale"]
-    opacity = [1.0 / (1.0 + math.exp(-o)) for o in data["opacity"]]
-    f_dc = [(c * 0.3 + 0.5) for c in data["f_dc"]]
-
-    rot = []
-    q_vals = data["rot"]
-    for i in range(0, len(q_vals), 4):
-        q = Quaternion(q_vals[i:i+4])
-        e = q.to_euler(euler_order)
-        rot.extend((e.x, e.y, e.z))
-
-    scale = [math.exp(s) for s in data["scale"]]
+    with np.errstate(over="ignore"):
+        opacity = 1.0 / (1.0 + np.exp(-np.asarray(data["opacity"], dtype=np.float32)))
+    f_dc = np.asarray(data["f_dc"], dtype=np.float32) * 0.3 + 0.5
+    scale = np.exp(np.asarray(data["scale"], dtype=np.float32))
+    rot = quaternions_to_euler(data["rot"], euler_order)
 
     return {
-        "xyz": xyz,
+        "xyz": data["xyz"],
         "f_dc": f_dc,
         "opacity": opacity,
         "scale": scale,
@@ -100,10 +321,208 @@ def process_attributes(data, euler_order="XYZ"):
         "count": data["count"]
     }
 
+
+def unprocess_attributes(data, euler_order="XYZ"):
+    """Inverse of `process_attributes`: raw PLY columns from processed attributes."""
+    eps = np.finfo(np.float32).eps
+    opacity = np.clip(np.asarray(data["opacity"], dtype=np.float32), eps, 1.0 - eps)
+    with np.errstate(divide="ignore"):
+        scale = np.log(np.maximum(np.asarray(data["scale"], dtype=np.float32), np.finfo(np.float32).tiny))
+
+    return {
+        "xyz": data["xyz"],
+        "f_dc": (np.asarray(data["f_dc"], dtype=np.float32) - 0.5) / 0.3,
+        "opacity": np.log(opacity / (1.0 - opacity)),
+        "scale": scale,
+        "rot": euler_to_quaternions(data["rot"], euler_order),
+        "count": data["count"]
+    }
+
+
+def read_splats(mesh):
+    """Positions and processed attributes of a splat mesh, like `process_attributes` returns them."""
+    count = len(mesh.vertices)
+    data = {"xyz": np.empty(count * 3, dtype=np.float32), "count": count}
+    mesh.vertices.foreach_get("co", data["xyz"])
+    for key, (attr_name, _, prop, width) in SPLAT_ATTRIBUTES.items():
+        attribute = mesh.attributes.get(attr_name)
+        if attribute is None:
+            raise ValueError(f"{mesh.name} has no {attr_name} attribute, it isn't an imported splat mesh")
+        data[key] = np.empty(count * width, dtype=np.float32)
+        attribute.data.foreach_get(prop, data[key])
+    return data
+
+
+def export_gs(obj, f) -> int:
+    """Writes the splats of `obj` as a 3DGS PLY to file object `f` and returns how many there were.
+
+    Positions are written in the object's local space, as stored in the mesh.
+    """
+    columns = unprocess_attributes(read_splats(obj.data))
+    write_custom_ply(f, columns)
+    return columns["count"]
+
+
+# Rotation order axes (i, j, k) and parity, as in Blender's math_rotation.c
+EULER_ORDERS = {
+    "XYZ": ((0, 1, 2), False),
+    "XZY": ((0, 2, 1), True),
+    "YXZ": ((1, 0, 2), True),
+    "YZX": ((1, 2, 0), False),
+    "ZXY": ((2, 0, 1), False),
+    "ZYX": ((2, 1, 0), True),
+}
+
+
+def quaternions_to_euler(quats, euler_order="XYZ"):
+    """Vectorized `Quaternion(q).to_euler(euler_order)` for flat [w,x,y,z,...] input.
+
+    Returns a flat float32 array [x,y,z,x,y,z,...] of Euler angles.
+    """
+    q = np.asarray(quats, dtype=np.float64).reshape(-1, 4)
+    (i, j, k), parity = EULER_ORDERS[euler_order]
+
+    # Normalize; like mathutils, a zero quaternion becomes (0, 1, 0, 0)
+    length = np.sqrt(np.einsum("ij,ij->i", q, q))
+    zero = length == 0.0
+    q = q / np.where(zero, 1.0, length)[:, None]
+    q[zero] = (0.0, 1.0, 0.0, 0.0)
+
+    w, x, y, z = (q * math.sqrt(2.0)).T
+
+    # Rotation matrix elements m[col][row], only computed when needed
+    elements = {
+        (0, 0): lambda: 1.0 - y * y - z * z,
+        (0, 1): lambda: w * z + x * y,
+        (0, 2): lambda: -w * y + x * z,
+        (1, 0): lambda: -w * z + x * y,
+        (1, 1): lambda: 1.0 - x * x - z * z,
+        (1, 2): lambda: w * x + y * z,
+        (2, 0): lambda: w * y + x * z,
+        (2, 1): lambda: -w * x + y * z,
+        (2, 2): lambda: 1.0 - x * x - y * y,
+    }
+    m_ii, m_ij, m_ik = elements[i, i](), elements[i, j](), elements[i, k]()
+    m_jk, m_kk = elements[j, k](), elements[k, k]()
+
+    cy = np.hypot(m_ii, m_ij)
+    eul1 = np.empty((len(q), 3))
+    eul2 = np.empty((len(q), 3))
+    eul1[:, i] = np.arctan2(m_jk, m_kk)
+    eul1[:, j] = np.arctan2(-m_ik, cy)
+    eul1[:, k] = np.arctan2(m_ij, m_ii)
+    eul2[:, i] = np.arctan2(-m_jk, -m_kk)
+    eul2[:, j] = np.arctan2(-m_ik, -cy)
+    eul2[:, k] = np.arctan2(-m_ij, -m_ii)
+
+    # Gimbal lock: only one solution
+    singular = cy <= 16.0 * np.finfo(np.float32).eps
+    if singular.any():
+        m_kj, m_jj = elements[k, j]()[singular], elements[j, j]()[singular]
+        eul1[singular, i] = np.arctan2(-m_kj, m_jj)
+        eul1[singular, k] = 0.0
+        eul2[singular] = eul1[singular]
+
+    if parity:
+        eul1 = -eul1
+        eul2 = -eul2
+
+    # Pick the solution with the smallest rotation, as mathutils does
+    use_eul2 = np.abs(eul1).sum(axis=1) > np.abs(eul2).sum(axis=1)
+    eul1[use_eul2] = eul2[use_eul2]
+    return eul1.astype(np.float32).reshape(-1)
+
+
+# Point attribute type -> (foreach key, values per element, dtype) of the attributes keep_splats carries over
+ATTRIBUTE_LAYOUTS = {
+    "FLOAT": ("value", 1, np.float32),
+    "INT": ("value", 1, np.int32),
+    "BOOLEAN": ("value", 1, bool),
+    "FLOAT2": ("vector", 2, np.float32),
+    "FLOAT_VECTOR": ("vector", 3, np.float32),
+    "FLOAT_COLOR": ("color", 4, np.float32),
+    "BYTE_COLOR": ("color", 4, np.float32),
+    "QUATERNION": ("value", 4, np.float32),
+}
+
+
+def keep_splats(obj, indices):
+    """Replaces the mesh of splat object `obj` with one holding only the vertices at `indices`.
+
+    Point attributes are gathered with NumPy instead of deleting vertices
+    through bmesh, which is far slower on millions of splats. Attributes of
+    other domains or types aren't carried over.
+    """
+    old = obj.data
+    count = len(old.vertices)
+    indices = np.asarray(indices, dtype=np.intp)
+
+    co = np.empty(count * 3, dtype=np.float32)
+    old.vertices.foreach_get("co", co)
+
+    mesh = bpy.data.meshes.new(name=old.name)
+    mesh.vertices.add(len(indices))
+    mesh.vertices.foreach_set("co", co.reshape(-1, 3)[indices].reshape(-1))
+    del co
+
+    for attribute in old.attributes:
+        layout = ATTRIBUTE_LAYOUTS.get(attribute.data_type)
+        if attribute.domain != "POINT" or attribute.name == "position" or attribute.name.startswith(".") or layout is None:
+            continue
+        prop, width, dtype = layout
+        values = np.empty(count * width, dtype=dtype)
+        attribute.data.foreach_get(prop, values)
+        mesh.attributes.new(name=attribute.name, type=attribute.data_type, domain="POINT").data.foreach_set(
+            prop, values.reshape(-1, width)[indices].reshape(-1)
+        )
+    mesh.update()
+
+    obj.data = mesh
+    if old.users == 0:
+        name = old.name
+        bpy.data.meshes.remove(old)
+        mesh.name = name
+
+
+def euler_to_quaternions(eulers, euler_order="XYZ"):
+    """Vectorized `Euler(e, euler_order).to_quaternion()` for flat [x,y,z,...] input.
+
+    Returns a flat float32 array [w,x,y,z,...] of unit quaternions, as in Blender's eulO_to_quat.
+    """
+    e = np.asarray(eulers, dtype=np.float64).reshape(-1, 3)
+    (i, j, k), parity = EULER_ORDERS[euler_order]
+
+    ti, tj, th = e[:, i] * 0.5, e[:, j] * (-0.5 if parity else 0.5), e[:, k] * 0.5
+    ci, cj, ch = np.cos(ti), np.cos(tj), np.cos(th)
+    si, sj, sh = np.sin(ti), np.sin(tj), np.sin(th)
+    cc, cs, sc, ss = ci * ch, ci * sh, si * ch, si * sh
+
+    q = np.empty((len(e), 4))
+    q[:, 0] = cj * cc + sj * ss
+    q[:, 1 + i] = cj * sc - sj * cs
+    q[:, 1 + j] = cj * ss + sj * cc
+    q[:, 1 + k] = cj * cs - sj * sc
+    if parity:
+        q[:, 1 + j] = -q[:, 1 + j]
+    return q.astype(np.float32).reshape(-1)
+
+
 def move_pivot_to_bottom(obj):
-    world_matrix = obj.matrix_world
-    verts_world = [world_matrix @ v.co for v in obj.data.vertices]
-    min_y = min(v.y for v in verts_world)
-    offset = Vector((0, min_y, 0))
-    for v in obj.data.vertices:
-        v.co -= obj.matrix_world.inverted() @ offset
+    mesh = obj.data
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    move_pivot_to_bottom_array(co, obj.matrix_world)
+    mesh.vertices.foreach_set("co", co)
+    mesh.update()
+
+
+def move_pivot_to_bottom_array(xyz, matrix_world=None):
+    """Shifts flat [x,y,z,...] positions in place so the lowest world-space Y lands on the origin."""
+    co = xyz.reshape(-1, 3)
+    if len(co) == 0:
+        return
+
+    matrix = np.eye(4) if matrix_world is None else np.array(matrix_world, dtype=np.float64)
+    min_y = (co @ matrix[1, :3] + matrix[1, 3]).min()
+    offset = np.linalg.inv(matrix) @ (0.0, min_y, 0.0, 1.0)
+    co -= offset[:3].astype(co.dtype)
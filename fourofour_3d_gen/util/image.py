@@ -0,0 +1,195 @@
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+from collections import OrderedDict
+from typing import NamedTuple
+
+import bpy
+import numpy as np
+
+# Upload format -> (Blender file format, MIME type, file name)
+UPLOAD_FORMATS = {
+    "PNG": ("PNG", "image/png", "image.png"),
+    "JPEG": ("JPEG", "image/jpeg", "image.jpg"),
+    "WEBP": ("WEBP", "image/webp", "image.webp"),
+}
+
+# Recently encoded uploads, so restarting or retrying a job doesn't encode again
+MAX_ENCODED_IMAGES = 8
+_encoded_images: OrderedDict = OrderedDict()
+
+# Pixel hashes of recently submitted images by datablock, so submitting one again doesn't read its pixels
+MAX_HASHED_IMAGES = 32
+_image_hashes: OrderedDict = OrderedDict()
+
+
+class EncodedImage(NamedTuple):
+    data: bytes
+    content_type: str
+    filename: str
+
+
+def read_pixels(image) -> np.ndarray:
+    """Returns the pixels of a Blender image as (height, width, 4) display RGBA, bottom row first."""
+    width, height = image.size
+    channels = image.channels
+    if width == 0 or height == 0:
+        raise ValueError(f"Image {image.name} has no pixels")
+
+    pixels = np.empty(width * height * channels, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    pixels = pixels.reshape(height, width, channels)
+
+    if channels != 4:
+        rgba = np.ones((height, width, 4), dtype=np.float32)
+        rgba[..., :3] = pixels[..., :3] if channels >= 3 else pixels[..., :1]
+        pixels = rgba
+
+    if image.is_float:
+        # Float buffers are scene linear, the gateway expects sRGB like save_render wrote
+        rgb = np.clip(pixels[..., :3], 0.0, 1.0)
+        pixels[..., :3] = np.where(rgb <= 0.0031308, rgb * 12.92, 1.055 * np.power(rgb, 1.0 / 2.4) - 0.055)
+
+    return pixels
+
+
+def pixels_hash(pixels: np.ndarray) -> str:
+    """Hash of the pixel size and data, independent of the image name and file path."""
+    pixels = np.ascontiguousarray(pixels)
+    digest = hashlib.sha256()
+    digest.update(np.array(pixels.shape, dtype=np.int64).tobytes())
+    digest.update(memoryview(pixels))
+    return digest.hexdigest()
+
+
+def _image_stamp(image):
+    """What the pixels of an image without unsaved changes follow from."""
+    path = bpy.path.abspath(image.filepath_raw) if image.source in {"FILE", "SEQUENCE", "MOVIE", "TILED"} else ""
+    try:
+        mtime = os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        mtime = None
+    return (
+        tuple(image.size), image.channels, image.is_float, image.source, path, mtime,
+        image.packed_file.size if image.packed_file else None,
+        image.colorspace_settings.name, image.generated_type, tuple(image.generated_color),
+    )
+
+
+def image_pixel_hash(image) -> str:
+    """`pixels_hash` of the pixels of a Blender image, reused while the image is unchanged.
+
+    Images with unsaved changes (painted or edited in Blender) are read every
+    time, since nothing tells when their pixels changed.
+    """
+    if image.is_dirty:
+        _image_hashes.pop(image.session_uid, None)
+        return pixels_hash(read_pixels(image))
+
+    stamp = _image_stamp(image)
+    cached = _image_hashes.get(image.session_uid)
+    if cached is not None and cached[0] == stamp:
+        _image_hashes.move_to_end(image.session_uid)
+        return cached[1]
+
+    pixel_hash = pixels_hash(read_pixels(image))
+    _image_hashes[image.session_uid] = (stamp, pixel_hash)
+    while len(_image_hashes) > MAX_HASHED_IMAGES:
+        _image_hashes.popitem(last=False)
+    return pixel_hash
+
+
+def resize_pixels(pixels: np.ndarray, max_edge: int) -> np.ndarray:
+    """Box-filters `pixels` down so the longest edge is at most `max_edge`; 0 keeps the size."""
+    height, width = pixels.shape[:2]
+    if max_edge <= 0 or max(width, height) <= max_edge:
+        return pixels
+
+    scale = max_edge / max(width, height)
+    for axis, size in ((0, height), (1, width)):
+        new_size = max(1, int(size * scale))
+        starts = np.arange(new_size) * size // new_size
+        counts = np.diff(np.append(starts, size)).astype(np.float32)
+        pixels = np.add.reduceat(pixels, starts, axis=axis)
+        pixels /= counts.reshape((-1, 1, 1) if axis == 0 else (1, -1, 1))
+    return pixels
+
+
+def encode_pixels(pixels: np.ndarray, pixel_hash: str, fmt: str = "PNG", max_edge: int = 1024, quality: int = 90) -> EncodedImage:
+    """Encodes `pixels` (as returned by `read_pixels`) for upload, reusing recent encodings of the same pixels."""
+    key = (pixel_hash, fmt, max_edge, quality)
+    encoded = _encoded_images.get(key)
+    if encoded is not None:
+        _encoded_images.move_to_end(key)
+        return encoded
+
+    file_format, content_type, filename = UPLOAD_FORMATS[fmt]
+    pixels = resize_pixels(pixels, max_edge)
+    if fmt == "PNG":
+        data = _encode_png(pixels)
+    else:
+        data = _encode_with_blender(pixels, file_format, quality)
+
+    encoded = EncodedImage(data, content_type, filename)
+    _encoded_images[key] = encoded
+    while len(_encoded_images) > MAX_ENCODED_IMAGES:
+        _encoded_images.popitem(last=False)
+    return encoded
+
+
+def encode_image(image, pixel_hash: str, fmt: str = "PNG", max_edge: int = 1024, quality: int = 90) -> EncodedImage:
+    """`encode_pixels` for a Blender image, whose pixels are only read if no recent encoding matches `pixel_hash`."""
+    key = (pixel_hash, fmt, max_edge, quality)
+    encoded = _encoded_images.get(key)
+    if encoded is not None:
+        _encoded_images.move_to_end(key)
+        return encoded
+    return encode_pixels(read_pixels(image), pixel_hash, fmt, max_edge, quality)
+
+
+def _encode_png(pixels: np.ndarray) -> bytes:
+    """Encodes RGBA float pixels as an 8-bit PNG in memory, dropping alpha when fully opaque."""
+    rgba = np.clip(pixels * 255.0 + 0.5, 0, 255).astype(np.uint8)[::-1]
+    if (rgba[..., 3] == 255).all():
+        rgba = rgba[..., :3]
+    height, width, channels = rgba.shape
+
+    # "Up" filter on every row: difference to the row above, modulo 256
+    rows = rgba.reshape(height, width * channels)
+    filtered = np.empty((height, width * channels + 1), dtype=np.uint8)
+    filtered[:, 0] = 2
+    filtered[0, 1:] = rows[0]
+    np.subtract(rows[1:], rows[:-1], out=filtered[1:, 1:])
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    color_type = 6 if channels == 4 else 2
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(filtered.tobytes(), 6)),
+        chunk(b"IEND", b""),
+    ))
+
+
+def _encode_with_blender(pixels: np.ndarray, file_format: str, quality: int) -> bytes:
+    """Encodes with Blender's image writer for lossy formats. Must run on the main thread."""
+    height, width = pixels.shape[:2]
+    image = bpy.data.images.new("threegen_upload", width, height, alpha=True)
+    fd, temp_path = tempfile.mkstemp(suffix="." + file_format.lower())
+    os.close(fd)
+    try:
+        image.pixels.foreach_set(np.ascontiguousarray(pixels, dtype=np.float32).reshape(-1))
+        image.file_format = file_format
+        image.save(filepath=temp_path, quality=quality)
+        with open(temp_path, "rb") as f:
+            return f.read()
+    finally:
+        bpy.data.images.remove(image)
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
@@ -1,47 +1,235 @@
-import struct
+import io
+import mmap
+from typing import NamedTuple
+
+import numpy as np
+
+# PLY scalar types -> NumPy type codes (byte order is added from the format line)
+PLY_TYPES = {
+    "char": "i1", "int8": "i1",
+    "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2",
+    "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4",
+    "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4",
+    "double": "f8", "float64": "f8",
+}
+
+PLY_FORMATS = {
+    "binary_little_endian": "<",
+    "binary_big_endian": ">",
+    "ascii": "=",
+}
+
+# Vertex properties read for each output column, in the order import_gs expects them.
+# Anything else in the file (normals, f_rest_*, ...) is skipped.
+COLUMNS = {
+    "xyz": ("x", "y", "z"),
+    "f_dc": ("f_dc_0", "f_dc_1", "f_dc_2"),
+    "opacity": ("opacity",),
+    "scale": ("scale_0", "scale_1", "scale_2"),
+    "rot": ("rot_0", "rot_1", "rot_2", "rot_3"),  # quaternion (w,x,y,z)
+}
+
+MAX_HEADER_LINES = 1024
+
+
+class PlyError(ValueError):
+    pass
+
+
+class PlyHeader(NamedTuple):
+    format: str
+    count: int
+    dtype: np.dtype  # one vertex record
+
+
+class BufferReader:
+    """Minimal binary reader over a bytes-like object, e.g. a native decoder output.
+
+    Lets the PLY parser read the header line by line and then view the body
+    in place, without wrapping (and copying) the buffer in a BytesIO.
+    """
+
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer).cast("B")
+        self.pos = 0
+
+    def readline(self) -> bytes:
+        end = self.pos
+        while end < len(self.buffer):
+            window = bytes(self.buffer[end:end + 256])
+            newline = window.find(b"\n")
+            if newline >= 0:
+                end += newline + 1
+                break
+            end += len(window)
+        line = bytes(self.buffer[self.pos:end])
+        self.pos = end
+        return line
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self.buffer) if size < 0 else min(self.pos + size, len(self.buffer))
+        data = bytes(self.buffer[self.pos:end])
+        self.pos = end
+        return data
+
+    def tell(self) -> int:
+        return self.pos
+
+
+def read_ply_header(data) -> PlyHeader:
+    """Reads the header from `data` and leaves it positioned at the start of the vertex body."""
+    if data.readline().strip() != b"ply":
+        raise PlyError("Not a PLY file")
+
+    fmt = None
+    count = None
+    properties = []
+    element = None
+    elements = []
+
+    for _ in range(MAX_HEADER_LINES):
+        raw = data.readline()
+        if not raw:
+            raise PlyError("Unexpected end of file in PLY header")
+        try:
+            line = raw.decode("ascii").split()
+        except UnicodeDecodeError:
+            raise PlyError("PLY header is not ASCII")
+
+        if not line or line[0] in ("comment", "obj_info"):
+            continue
+
+        keyword = line[0]
+        if keyword == "end_header":
+            break
+        elif keyword == "format":
+            if len(line) != 3 or line[1] not in PLY_FORMATS:
+                raise PlyError(f"Unsupported PLY format: {' '.join(line[1:])}")
+            fmt = line[1]
+        elif keyword == "element":
+            if len(line) != 3 or not line[2].isdigit():
+                raise PlyError(f"Malformed element line: {' '.join(line)}")
+            element = line[1]
+            elements.append(element)
+            if element == "vertex":
+                count = int(line[2])
+        elif keyword == "property":
+            if element != "vertex":
+                continue
+            if len(line) != 3 or line[1] == "list":
+                raise PlyError(f"Unsupported vertex property: {' '.join(line[1:])}")
+            if line[1] not in PLY_TYPES:
+                raise PlyError(f"Unknown property type: {line[1]}")
+            if any(name == line[2] for name, _ in properties):
+                raise PlyError(f"Duplicate vertex property: {line[2]}")
+            properties.append((line[2], line[1]))
+        else:
+            raise PlyError(f"Unexpected PLY header line: {' '.join(line)}")
+    else:
+        raise PlyError("PLY header has no end_header")
+
+    if fmt is None:
+        raise PlyError("PLY header has no format line")
+    if count is None:
+        raise PlyError("PLY file has no vertex element")
+    if elements[0] != "vertex":
+        raise PlyError("Vertex element must come first in the PLY file")
+
+    present = {name for name, _ in properties}
+    missing = [name for names in COLUMNS.values() for name in names if name not in present]
+    if missing:
+        raise PlyError(f"PLY file is missing vertex properties: {', '.join(missing)}")
+
+    byte_order = PLY_FORMATS[fmt]
+    dtype = np.dtype([(name, byte_order + PLY_TYPES[type_]) for name, type_ in properties])
+    return PlyHeader(fmt, count, dtype)
+
 
 def read_custom_ply(data):
-    # with open(path, "rb") as f:
-    #     # --- Skip header ---
+    header = read_ply_header(data)
+    return next(iter_ply_chunks(data, header, header.count))
+
+
+def iter_ply_chunks(data, header: PlyHeader, chunk_size: int):
+    """Yields column dicts for consecutive runs of at most `chunk_size` vertices.
+
+    `data` must be positioned at the start of the body, as left by read_ply_header.
+    At least one (possibly empty) chunk is always yielded.
+    """
+    chunk_size = max(chunk_size, 1)
+    itemsize = header.dtype.itemsize
+    buffer, offset = _body_buffer(data) if header.format != "ascii" else (None, 0)
+
+    start = 0
     while True:
-        line = data.readline().decode("ascii").strip()
-        if line == "end_header":
-            break
+        count = min(chunk_size, header.count - start)
+
+        if header.format == "ascii":
+            props = header.dtype.names
+            tokens = b" ".join(data.readline() for _ in range(count)).split()
+            if len(tokens) < count * len(props):
+                raise PlyError(f"PLY body is truncated: expected {header.count} vertices")
+            values = np.array(tokens[:count * len(props)], dtype=np.float64).reshape(count, len(props))
+            vertices = {name: values[:, i] for i, name in enumerate(props)}
+        else:
+            if buffer is None:
+                raw, raw_offset = data.read(count * itemsize), 0
+            else:
+                raw, raw_offset = buffer, offset + start * itemsize
+            if len(raw) - raw_offset < count * itemsize:
+                raise PlyError(f"PLY body is truncated: expected {header.count} vertices")
+            # View the body as structured records, no copy
+            vertices = np.frombuffer(raw, dtype=header.dtype, count=count, offset=raw_offset)
+
+        # Gather the needed properties by stride into flat contiguous float32 arrays (ready for foreach_set)
+        chunk = {key: _columns(vertices, names, count) for key, names in COLUMNS.items()}
+        chunk["count"] = count
+        del vertices
+        yield chunk
+
+        start += count
+        if start >= header.count:
+            return
+
+
+def write_custom_ply(f, columns) -> None:
+    """Writes a column dict like `read_custom_ply` returns as a binary little endian 3DGS PLY to file object `f`.
+
+    Vertices get zero normals and no higher order SH, the layout 3DGS
+    trainers write at SH degree 0. The body is assembled as one record
+    array and written in a single call.
+    """
+    count = columns["count"]
+    names = list(COLUMNS["xyz"]) + ["nx", "ny", "nz"] + [name for key in ("f_dc", "opacity", "scale", "rot") for name in COLUMNS[key]]
+    vertices = np.zeros(count, dtype=[(name, "<f4") for name in names])
+    for key, key_names in COLUMNS.items():
+        values = np.asarray(columns[key], dtype=np.float32).reshape(count, len(key_names))
+        for i, name in enumerate(key_names):
+            vertices[name] = values[:, i]
+
+    header = ["ply", "format binary_little_endian 1.0", f"element vertex {count}"]
+    header += [f"property float {name}" for name in names]
+    header += ["end_header"]
+    f.write(("\n".join(header) + "\n").encode("ascii"))
+    f.write(memoryview(vertices).cast("B"))
+
+
+def _body_buffer(data):
+    """Returns (buffer, offset) to read the body in place from mapped files and buffers, else (None, 0)."""
+    if isinstance(data, mmap.mmap):
+        return data, data.tell()
+    if isinstance(data, io.BytesIO):
+        return data.getbuffer(), data.tell()
+    if isinstance(data, BufferReader):
+        return data.buffer, data.tell()
+    return None, 0
+
 
-    fmt = "<14f"  # 14 floats per vertex, little-endian
-    size = struct.calcsize(fmt)
-
-    # Read all vertex data
-    raw = data.read()
-    count = len(raw) // size
-
-    # Bulk unpack
-    unpacked = struct.iter_unpack(fmt, raw)
-
-    # Prepare flat lists (ready for foreach_set)
-    xyz = []
-    f_dc = []
-    opacity = []
-    scale = []
-    rot = []
-
-    for values in unpacked:
-        # xyz
-        xyz.extend(values[0:3])
-        # f_dc
-        f_dc.extend(values[3:6])
-        # opacity
-        opacity.append(values[6])
-        # scale
-        scale.extend(values[7:10])
-        # quaternion (w,x,y,z)
-        rot.extend(values[10:14])
-
-    return {
-        "xyz": xyz,          # flat [x,y,z,x,y,z,...]
-        "f_dc": f_dc,        # flat [r,g,b,r,g,b,...]
-        "opacity": opacity,  # list [o,o,o,...]
-        "scale": scale,      # flat [sx,sy,sz,...]
-        "rot": rot,          # flat [w,x,y,z,w,x,y,z,...]
-        "count": count       # number of vertices
-    }
+def _columns(vertices, names, count):
+    out = np.empty((count, len(names)), dtype=np.float32)
+    for i, name in enumerate(names):
+        out[:, i] = vertices[name]
+    return out.reshape(-1)
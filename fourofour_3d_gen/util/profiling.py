@@ -0,0 +1,121 @@
+import contextlib
+import time
+import tracemalloc
+from collections import deque
+
+# Recent import profiles, newest last
+MAX_PROFILES = 20
+_profiles: deque = deque(maxlen=MAX_PROFILES)
+
+
+class Span:
+    """Accumulated wall time of one named stage, which may run in several steps."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.seconds = 0.0
+        self.calls = 0
+        self.count = 0
+        self.peak_bytes: int | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "seconds": self.seconds,
+            "calls": self.calls,
+            "count": self.count,
+            "peak_bytes": self.peak_bytes,
+        }
+
+
+class ImportProfile:
+    """Named spans of one import, in the order they first ran.
+
+    Spans are timed around the work itself, so time a stepped import spends
+    waiting between steps isn't counted. With `trace_memory`, each span also
+    records the peak Python/NumPy allocation while it ran; tracemalloc is
+    process wide, so spans running on other threads at the same time show up
+    in each other's peaks.
+    """
+
+    def __init__(self, name: str, trace_memory: bool = False) -> None:
+        self.name = name
+        self.created = time.time()
+        self.count = 0
+        self.trace_memory = trace_memory
+        self.spans: dict[str, Span] = {}
+        # Splat counts of the import besides `count`, e.g. how many splats were dropped
+        self.stats: dict[str, int] = {}
+        self._started_tracing = False
+
+    @contextlib.contextmanager
+    def span(self, name: str, count: int | None = None):
+        """Times the block as (part of) span `name`, adding `count` splats, or all splats of the import if None."""
+        span = self.spans.get(name)
+        if span is None:
+            span = self.spans[name] = Span(name)
+
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.seconds += time.perf_counter() - start
+            span.calls += 1
+            # Stages run in chunks add up their counts, the others handled every splat
+            span.count = span.count + count if count is not None else self.count
+            if self.trace_memory and tracemalloc.is_tracing():
+                peak = tracemalloc.get_traced_memory()[1] - base
+                span.peak_bytes = max(span.peak_bytes or 0, peak)
+
+    def total_seconds(self) -> float:
+        return sum(span.seconds for span in self.spans.values())
+
+    def close(self) -> None:
+        """Stops tracing memory if this profile started it. Must be called on every path an import ends on."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def finish(self) -> None:
+        """Closes the profile and keeps it in the recent list."""
+        self.close()
+        _profiles.append(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "created": self.created,
+            "count": self.count,
+            "total_seconds": self.total_seconds(),
+            "stats": dict(self.stats),
+            "spans": [span.to_dict() for span in self.spans.values()],
+        }
+
+
+def span(profile: ImportProfile | None, name: str, count: int | None = None):
+    """`profile.span(name, count)`, or a no-op context when there is no profile."""
+    if profile is None:
+        return contextlib.nullcontext()
+    return profile.span(name, count)
+
+
+def close(profile: ImportProfile | None) -> None:
+    """`profile.close()`, unless there is no profile."""
+    if profile is not None:
+        profile.close()
+
+
+def get_profiles() -> list[ImportProfile]:
+    """Recent import profiles, newest first."""
+    return list(reversed(_profiles))
+
+
+def clear_profiles() -> None:
+    _profiles.clear()
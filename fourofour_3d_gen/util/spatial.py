@@ -0,0 +1,284 @@
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+
+# Average splats per occupied cell the grid is sized for
+TARGET_PER_CELL = 32
+
+# Cells per axis at most, so cell keys fit in int64
+MAX_RESOLUTION = 2**20
+
+
+def _spread_bits(values):
+    """Spreads the low 21 bits of every value so two zero bits follow each bit."""
+    values = values.astype(np.uint64) & np.uint64(0x1FFFFF)
+    for shift, mask in (
+        (32, 0x1F00000000FFFF),
+        (16, 0x1F0000FF0000FF),
+        (8, 0x100F00F00F00F00F),
+        (4, 0x10C30C30C30C30C3),
+        (2, 0x1249249249249249),
+    ):
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def morton_codes(co, bits: int = 21):
+    """Morton (Z-order) code of every point, quantized to `bits` bits per axis within the bounding box of all points.
+
+    Points close in the order are close in space.
+    """
+    co = np.asarray(co, dtype=np.float32).reshape(-1, 3)
+    if not len(co):
+        return np.empty(0, dtype=np.uint64)
+    cells = 2**min(bits, 21) - 1
+    lo = co.min(axis=0)
+    extent = float((co.max(axis=0) - lo).max()) or 1.0
+    cell = np.minimum(((co - lo) * (cells / extent)).astype(np.int64), cells)
+    return (_spread_bits(cell[:, 0]) << np.uint64(2)) | (_spread_bits(cell[:, 1]) << np.uint64(1)) | _spread_bits(cell[:, 2])
+
+
+def _concat_ranges(starts, counts):
+    """Concatenated ranges starts[i]:starts[i] + counts[i], without a Python loop."""
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.intp)
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(total)
+
+
+class SplatGrid:
+    """Uniform grid over points, stored as the point indices sorted by cell.
+
+    Only occupied cells are kept, as a sorted array of cell keys, so memory
+    is linear in the points. A query looks up the occupied cells in each grid
+    row its box spans with a binary search, takes every point of cells
+    completely inside the shape and tests only the points of cells on its
+    border. Its cost depends on the rows and cells the box covers, not on
+    the total number of points.
+    """
+
+    def __init__(self, co, target_per_cell: int = TARGET_PER_CELL) -> None:
+        self.co = np.asarray(co, dtype=np.float32).reshape(-1, 3)
+        count = len(self.co)
+        if count == 0:
+            self.origin = np.zeros(3)
+            self.cell_size = 1.0
+            self.order = np.empty(0, dtype=np.intp)
+            self.resolution = np.ones(3, dtype=np.int64)
+            self.cells = np.empty((0, 3), dtype=np.int64)
+            self.keys = np.empty(0, dtype=np.int64)
+            self.starts = self.counts = np.empty(0, dtype=np.intp)
+            return
+
+        lo, hi = self.co.min(axis=0).astype(np.float64), self.co.max(axis=0).astype(np.float64)
+        extent = np.maximum(hi - lo, 1e-6)
+        # Cube cells sized so a uniformly filled bounding box has `target_per_cell` points per cell
+        cells_wanted = max(count / max(target_per_cell, 1), 1.0)
+        self.cell_size = max(float(np.cbrt(extent.prod() / cells_wanted)), float(extent.max()) / MAX_RESOLUTION)
+        self.origin = lo
+        self.resolution = np.minimum(np.floor(extent / self.cell_size).astype(np.int64) + 1, MAX_RESOLUTION)
+
+        cell = self._cell_of(self.co)
+        keys = (cell[:, 0] * self.resolution[1] + cell[:, 1]) * self.resolution[2] + cell[:, 2]
+        self.order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[self.order]
+        first = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        self.starts = first
+        self.counts = np.diff(np.r_[first, count])
+        self.cells = cell[self.order[first]]
+        self.keys = sorted_keys[first]
+
+    def __len__(self) -> int:
+        return len(self.co)
+
+    def _cell_of(self, points):
+        cell = np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(cell, 0, self.resolution - 1)
+
+    def _cell_bounds(self, cells):
+        lo = self.origin + cells * self.cell_size
+        return lo, lo + self.cell_size
+
+    def _points(self, cells):
+        """Indices of the points in occupied cells `cells` (indices into the occupied cell list)."""
+        return self.order[_concat_ranges(self.starts[cells], self.counts[cells])]
+
+    def _cells_in(self, cell_lo, cell_hi):
+        """Occupied cells (indices into the occupied cell list) within the inclusive cell range."""
+        cell_lo = np.maximum(cell_lo, 0).astype(np.int64)
+        cell_hi = np.minimum(cell_hi, self.resolution - 1).astype(np.int64)
+        if np.any(cell_lo > cell_hi):
+            return np.empty(0, dtype=np.intp)
+
+        # Cells of one (x, y) row have consecutive keys, so each row is one binary search
+        xs = np.arange(cell_lo[0], cell_hi[0] + 1)
+        ys = np.arange(cell_lo[1], cell_hi[1] + 1)
+        rows = ((xs[:, None] * self.resolution[1] + ys[None, :]) * self.resolution[2]).reshape(-1)
+        first = np.searchsorted(self.keys, rows + cell_lo[2], side="left")
+        last = np.searchsorted(self.keys, rows + cell_hi[2], side="right")
+        return _concat_ranges(first, last - first)
+
+    def query(self, lo, hi, inside=None, contains=None):
+        """Indices of the points in the box [lo, hi] that pass `inside`, sorted.
+
+        `inside(points)` tests an (n, 3) array of points and returns a bool
+        mask. `contains(cell_lo, cell_hi)` tells for (m, 3) cell bounds which
+        cells lie completely inside the shape, whose points are then taken
+        without testing them. Without either, the box itself is the shape.
+        """
+        if not len(self.co):
+            return np.empty(0, dtype=np.intp)
+        lo, hi = np.asarray(lo, dtype=np.float64), np.asarray(hi, dtype=np.float64)
+        if inside is None:
+            inside = lambda points: np.all((points >= lo) & (points <= hi), axis=1)
+            contains = lambda cell_lo, cell_hi: np.all((cell_lo >= lo) & (cell_hi <= hi), axis=1)
+
+        candidates = self._cells_in(np.floor((lo - self.origin) / self.cell_size), np.floor((hi - self.origin) / self.cell_size))
+        if not len(candidates):
+            return np.empty(0, dtype=np.intp)
+
+        full = np.zeros(len(candidates), dtype=bool) if contains is None else contains(*self._cell_bounds(self.cells[candidates]))
+        border = self._points(candidates[~full])
+        result = np.concatenate([self._points(candidates[full]), border[inside(self.co[border])]])
+        result.sort()
+        return result
+
+    def query_sphere(self, center, radius: float):
+        """Indices of the points within `radius` of `center`, sorted."""
+        center = np.asarray(center, dtype=np.float64)
+
+        def inside(points):
+            offset = points - center
+            return np.einsum("ij,ij->i", offset, offset) <= radius * radius
+
+        def contains(cell_lo, cell_hi):
+            # The farthest corner of the cell is within the sphere
+            farthest = np.maximum(np.abs(cell_lo - center), np.abs(cell_hi - center))
+            return np.einsum("ij,ij->i", farthest, farthest) <= radius * radius
+
+        return self.query(center - radius, center + radius, inside, contains)
+
+
+def transform_points(matrix, points):
+    """(n, 3) points transformed by a 4x4 matrix."""
+    matrix = np.asarray(matrix, dtype=np.float64)
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def _corners_inside(inside):
+    """Cell containment test for a convex shape: a cell is inside if all of its corners are."""
+    def contains(cell_lo, cell_hi):
+        full = np.ones(len(cell_lo), dtype=bool)
+        for corner in np.ndindex(2, 2, 2):
+            full &= inside(np.where(np.array(corner, dtype=bool), cell_hi, cell_lo))
+        return full
+
+    return contains
+
+
+def query_oriented_box(grid: SplatGrid, to_box, box_lo, box_hi):
+    """Indices of the grid points inside the box [box_lo, box_hi] of another space, sorted.
+
+    `to_box` is the 4x4 matrix from grid space to the space of the box, so
+    rotated and scaled boxes (e.g. another object's bounds) can be queried.
+    """
+    to_box = np.asarray(to_box, dtype=np.float64)
+    box_lo, box_hi = np.asarray(box_lo, dtype=np.float64), np.asarray(box_hi, dtype=np.float64)
+    corners = np.array([[x, y, z] for x in (box_lo[0], box_hi[0]) for y in (box_lo[1], box_hi[1]) for z in (box_lo[2], box_hi[2])])
+    corners = transform_points(np.linalg.inv(to_box), corners)
+
+    def inside(points):
+        points = transform_points(to_box, points)
+        return np.all((points >= box_lo) & (points <= box_hi), axis=1)
+
+    return grid.query(corners.min(axis=0), corners.max(axis=0), inside, _corners_inside(inside))
+
+
+def query_world_sphere(grid: SplatGrid, to_world, center, radius: float):
+    """Indices of the grid points within `radius` of the world space `center`, sorted.
+
+    `to_world` is the 4x4 matrix from grid space to world space, which may scale non-uniformly.
+    """
+    to_world = np.asarray(to_world, dtype=np.float64)
+    to_grid = np.linalg.inv(to_world)
+    center = np.asarray(center, dtype=np.float64)
+    # Extent of the world space sphere along the grid axes
+    extent = radius * np.linalg.norm(to_grid[:3, :3], axis=1)
+    local_center = transform_points(to_grid, center[None])[0]
+
+    def inside(points):
+        offset = transform_points(to_world, points) - center
+        return np.einsum("ij,ij->i", offset, offset) <= radius * radius
+
+    return grid.query(local_center - extent, local_center + extent, inside, _corners_inside(inside))
+
+
+class _GridCache:
+    """The grid of the most recently queried mesh.
+
+    Kept until a depsgraph update reports a geometry change of the mesh (see
+    `register`), or its vertex count changes, so repeated queries don't read
+    the positions again.
+    """
+
+    def __init__(self) -> None:
+        self.mesh_uid: int | None = None
+        self.grid: SplatGrid | None = None
+
+    def get(self, mesh) -> SplatGrid:
+        if self.grid is None or self.mesh_uid != mesh.session_uid or len(self.grid) != len(mesh.vertices):
+            co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get("co", co)
+            self.mesh_uid, self.grid = mesh.session_uid, SplatGrid(co)
+        return self.grid
+
+    def clear(self) -> None:
+        self.mesh_uid = self.grid = None
+
+
+_grid_cache = _GridCache()
+
+
+def get_mesh_grid(mesh) -> SplatGrid:
+    """Grid over the vertex positions of `mesh`, reused until its geometry changes."""
+    return _grid_cache.get(mesh)
+
+
+def clear_grid_cache() -> None:
+    _grid_cache.clear()
+
+
+@persistent
+def _on_depsgraph_update(scene, depsgraph):
+    if _grid_cache.grid is None:
+        return
+    for update in depsgraph.updates:
+        if not update.is_updated_geometry:
+            continue
+        data = update.id.original
+        if isinstance(data, bpy.types.Object):
+            data = data.data
+        if data is not None and getattr(data, "session_uid", None) == _grid_cache.mesh_uid:
+            _grid_cache.clear()
+            return
+
+
+@persistent
+def _on_load(*args):
+    clear_grid_cache()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(_on_depsgraph_update)
+    bpy.app.handlers.load_post.append(_on_load)
+
+
+def unregister():
+    for handlers, handler in (
+        (bpy.app.handlers.depsgraph_update_post, _on_depsgraph_update),
+        (bpy.app.handlers.load_post, _on_load),
+    ):
+        if handler in handlers:
+            handlers.remove(handler)
+    clear_grid_cache()
@@ -0,0 +1,219 @@
+"""Pure NumPy decoder for the SPZ gaussian splat format.
+
+Produces the same raw columns as `read_custom_ply` (log scales, logit
+opacities, SH0 colours and w,x,y,z quaternions), so the result can be
+imported without serializing to PLY or loading the native library.
+"""
+import gzip
+import math
+import zlib
+from typing import NamedTuple
+
+import numpy as np
+
+from . import profiling
+
+SPZ_MAGIC = 0x5053474E  # "NGSP"
+SPZ_HEADER_DTYPE = np.dtype([
+    ("magic", "<u4"),
+    ("version", "<u4"),
+    ("num_points", "<u4"),
+    ("sh_degree", "u1"),
+    ("fractional_bits", "u1"),
+    ("flags", "u1"),
+    ("reserved", "u1"),
+])
+
+# Quantization constants from the reference implementation
+COLOR_SCALE = 0.15
+SH_COEFFS = {0: 0, 1: 3, 2: 8, 3: 15}
+
+
+class SPZFormatError(ValueError):
+    pass
+
+
+def read_spz(data):
+    """Decodes gzipped SPZ `data` (any bytes-like object) into column arrays."""
+    try:
+        raw = gzip.decompress(data)
+    except (OSError, EOFError) as e:
+        raise SPZFormatError(f"Invalid SPZ stream: {e}") from e
+    return read_spz_raw(raw)
+
+
+def read_spz_raw(raw):
+    """Decodes an already decompressed SPZ payload into column arrays."""
+    layout = _read_layout(raw)
+    if len(raw) < layout.end:
+        raise SPZFormatError(f"SPZ payload is truncated: expected {layout.count} points")
+
+    columns = {"count": layout.count}
+    for name, offset, size in layout.sections:
+        section = np.frombuffer(raw, dtype=np.uint8, count=size, offset=offset)
+        _decode_section(columns, name, section, layout)
+    return columns
+
+
+class SpzStreamDecoder:
+    """Decodes an SPZ stream incrementally, e.g. while it is being downloaded.
+
+    Chunks are gunzipped as they are fed, and each attribute section is decoded
+    as soon as all of its bytes arrived, so most of the work overlaps with the
+    download. `finish` returns the same column dict as `read_spz`. Decoding
+    time is recorded as the "spz decompress" span of `profile`, if given.
+    """
+
+    def __init__(self, profile=None) -> None:
+        self._profile = profile
+        self._inflate = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)  # gzip framing
+        self._raw = bytearray()
+        self._layout = None
+        self._next_section = 0
+        self._columns = {}
+
+    def feed(self, chunk) -> None:
+        with profiling.span(self._profile, "spz decompress", 0):
+            try:
+                self._raw += self._inflate.decompress(chunk)
+            except zlib.error as e:
+                raise SPZFormatError(f"Invalid SPZ stream: {e}") from e
+            self._decode_available()
+
+    def finish(self):
+        count = self._layout.count if self._layout is not None else 0
+        with profiling.span(self._profile, "spz decompress", count):
+            try:
+                self._raw += self._inflate.flush()
+            except zlib.error as e:
+                raise SPZFormatError(f"Invalid SPZ stream: {e}") from e
+            if not self._inflate.eof:
+                raise SPZFormatError("SPZ stream ended unexpectedly")
+
+            self._decode_available()
+            if self._layout is None or self._next_section < len(self._layout.sections):
+                count = self._layout.count if self._layout is not None else 0
+                raise SPZFormatError(f"SPZ payload is truncated: expected {count} points")
+            return self._columns
+
+    def _decode_available(self) -> None:
+        if self._layout is None:
+            if len(self._raw) < SPZ_HEADER_DTYPE.itemsize:
+                return
+            self._layout = _read_layout(bytes(self._raw[:SPZ_HEADER_DTYPE.itemsize]))
+            self._columns["count"] = self._layout.count
+
+        sections = self._layout.sections
+        while self._next_section < len(sections):
+            name, offset, size = sections[self._next_section]
+            if len(self._raw) < offset + size:
+                return
+            # Decoded from a copy so the growing buffer is never exported to NumPy
+            section = np.frombuffer(bytes(self._raw[offset:offset + size]), dtype=np.uint8)
+            _decode_section(self._columns, name, section, self._layout)
+            self._next_section += 1
+
+
+class _Layout(NamedTuple):
+    version: int
+    fractional_bits: int
+    count: int
+    sections: list  # (name, offset, size) in file order
+    end: int
+
+
+def _read_layout(raw) -> _Layout:
+    """Validates the header and locates the attribute sections."""
+    if len(raw) < SPZ_HEADER_DTYPE.itemsize:
+        raise SPZFormatError("SPZ payload is too short for its header")
+
+    header = np.frombuffer(raw, dtype=SPZ_HEADER_DTYPE, count=1)[0]
+    if header["magic"] != SPZ_MAGIC:
+        raise SPZFormatError("Not an SPZ payload")
+
+    version = int(header["version"])
+    if version not in (1, 2, 3):
+        raise SPZFormatError(f"Unsupported SPZ version: {version}")
+    if int(header["sh_degree"]) not in SH_COEFFS:
+        raise SPZFormatError(f"Unsupported SH degree: {header['sh_degree']}")
+
+    count = int(header["num_points"])
+    position_bytes = 2 if version == 1 else 3
+    rotation_bytes = 4 if version >= 3 else 3
+    sh_bytes = SH_COEFFS[int(header["sh_degree"])] * 3
+
+    # Attributes are stored one after another, each for all points
+    sizes = {
+        "positions": count * 3 * position_bytes,
+        "alphas": count,
+        "colors": count * 3,
+        "scales": count * 3,
+        "rotations": count * rotation_bytes,
+        "sh": count * sh_bytes,
+    }
+    sections = []
+    offset = SPZ_HEADER_DTYPE.itemsize
+    for name, size in sizes.items():
+        sections.append((name, offset, size))
+        offset += size
+    return _Layout(version, int(header["fractional_bits"]), count, sections, offset)
+
+
+def _decode_section(columns, name, section, layout) -> None:
+    """Decodes one attribute section into its column(s) of `columns`."""
+    if name == "positions":
+        if layout.version == 1:
+            columns["xyz"] = section.view("<f2").astype(np.float32)
+        else:
+            columns["xyz"] = _unpack_positions(section, layout.fractional_bits)  # flat [x,y,z,...]
+    elif name == "alphas":
+        # Stored as 8-bit sigmoid, returned as logit like PLY opacities
+        alpha = section.astype(np.float32) / 255.0
+        with np.errstate(divide="ignore"):
+            columns["opacity"] = np.log(alpha / (1.0 - alpha)).astype(np.float32)
+    elif name == "colors":
+        columns["f_dc"] = (section.astype(np.float32) / 255.0 - 0.5) / COLOR_SCALE  # flat [r,g,b,...]
+    elif name == "scales":
+        columns["scale"] = section.astype(np.float32) / 16.0 - 10.0  # flat [sx,sy,sz,...]
+    elif name == "rotations":
+        if layout.version >= 3:
+            columns["rot"] = _unpack_rotations_smallest_three(section)  # flat [w,x,y,z,...]
+        else:
+            columns["rot"] = _unpack_rotations_xyz(section)
+    # Higher order SH coefficients are not imported
+
+
+def _unpack_positions(packed, fractional_bits):
+    """24-bit signed fixed point -> float32."""
+    b = packed.reshape(-1, 3).astype(np.int32)
+    fixed = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+    fixed -= (fixed & 0x800000) << 1  # sign extend
+    return (fixed.astype(np.float32) * np.float32(1.0 / (1 << fractional_bits))).reshape(-1)
+
+
+def _unpack_rotations_xyz(packed):
+    """Version 2: x,y,z quantized to 8 bits, w >= 0 reconstructed."""
+    xyz = packed.reshape(-1, 3).astype(np.float32) / 127.5 - 1.0
+    w = np.sqrt(np.maximum(0.0, 1.0 - np.einsum("ij,ij->i", xyz, xyz)))
+    return np.column_stack((w, xyz)).astype(np.float32).reshape(-1)
+
+
+def _unpack_rotations_smallest_three(packed):
+    """Version 3: index of the largest component plus the other three as 9-bit magnitude and sign."""
+    b = packed.reshape(-1, 4).astype(np.uint32)
+    comp = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16) | (b[:, 3] << 24)
+    largest = (comp >> 30).astype(np.intp)
+
+    mask = (1 << 9) - 1
+    q = np.zeros((len(comp), 4), dtype=np.float32)  # x,y,z,w
+    rows = np.arange(len(comp))
+    # Components are packed from w down to x, skipping the largest
+    for i in (3, 2, 1, 0):
+        skip = largest == i
+        value = math.sqrt(0.5) * (comp & mask).astype(np.float32) / mask
+        value = np.where((comp >> 9) & 1, -value, value)
+        q[:, i] = np.where(skip, 0.0, value)
+        comp = np.where(skip, comp, comp >> 10)
+
+    q[rows, largest] = np.sqrt(np.maximum(0.0, 1.0 - np.einsum("ij,ij->i", q, q)))
+    return q[:, [3, 0, 1, 2]].reshape(-1)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The add-on is imported through benchmarks/_blender_stub.py, and the SPZ tests use the synthetic inputs
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
@@ -0,0 +1,125 @@
+"""Writes the SPZ fixtures of test_spz.py and their expected decoded columns.
+
+The payloads are random bytes laid out section by section as the SPZ format
+describes, not the output of an encoder, so the built-in decoder is checked
+against data its author didn't write. Values whose decoding isn't pinned
+down by the format are avoided: alphas of 0 and 255 (infinite logits),
+version 2 rotations with |xyz| > 1 and version 3 ones whose three smallest
+components exceed unit length.
+
+The expected columns are decoded by the native libspz_shared when it loads,
+else by the independent reader of NVIDIA's omniverse-gsplat-converter
+(`pip install omniverse-gsplat-converter`). Which one is stored in the
+"decoder" entry of every .npz. Rerun where the native library is available:
+
+    python tests/data/make_spz_fixtures.py
+"""
+import gzip
+import importlib.util
+import os
+import sys
+import types
+
+import numpy as np
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(os.path.dirname(DATA_DIR))
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+import _blender_stub  # noqa: E402
+
+_blender_stub.install()
+from fourofour_3d_gen.spz_loader import SPZLoader  # noqa: E402
+from fourofour_3d_gen.util import ply  # noqa: E402
+
+# File name -> (version, SH degree, splats)
+FIXTURES = {
+    "splats_v2.spz": (2, 0, 48),
+    "splats_v3_sh1.spz": (3, 1, 64),
+}
+
+FRACTIONAL_BITS = 12
+SH_COEFFS = {0: 0, 1: 3, 2: 8, 3: 15}
+
+
+def random_payload(version, sh_degree, count, rng):
+    header = np.array(
+        [(0x5053474E, version, count, sh_degree, FRACTIONAL_BITS, 0, 0)],
+        dtype=[("magic", "<u4"), ("version", "<u4"), ("num_points", "<u4"), ("sh_degree", "u1"),
+               ("fractional_bits", "u1"), ("flags", "u1"), ("reserved", "u1")],
+    )
+    sections = [
+        rng.integers(0, 256, count * 9, dtype=np.uint8),  # positions, 24-bit fixed point
+        rng.integers(1, 255, count, dtype=np.uint8),  # alphas
+        rng.integers(0, 256, count * 3, dtype=np.uint8),  # colors
+        rng.integers(0, 256, count * 3, dtype=np.uint8),  # scales
+        random_rotations(version, count, rng),
+        rng.integers(0, 256, count * SH_COEFFS[sh_degree] * 3, dtype=np.uint8),  # higher order SH
+    ]
+    return header.tobytes() + b"".join(section.tobytes() for section in sections)
+
+
+def random_rotations(version, count, rng):
+    if version == 2:
+        rotations = []
+        while len(rotations) < count:
+            xyz = rng.integers(0, 256, 3, dtype=np.uint8)
+            if np.sum((xyz / 127.5 - 1.0) ** 2) <= 1.0:
+                rotations.append(xyz)
+        return np.array(rotations, dtype=np.uint8)
+
+    words = []
+    while len(words) < count:
+        word = int(rng.integers(0, 2**32, dtype=np.uint64))
+        magnitudes = [(word >> shift) & 0x1FF for shift in (0, 10, 20)]
+        if sum((np.sqrt(0.5) * m / 0x1FF) ** 2 for m in magnitudes) <= 1.0:
+            words.append(word)
+    return np.array(words, dtype="<u4")
+
+
+def decode_native(path):
+    loader = SPZLoader()
+    with open(path, "rb") as f:
+        return "libspz_shared", ply.read_custom_ply(ply.BufferReader(loader.decompress(f.read())))
+
+
+def decode_reference(path):
+    # The package __init__ pulls in USD, which spz_reader doesn't need
+    if "omniverse_gsplat_converter" not in sys.modules:
+        spec = importlib.util.find_spec("omniverse_gsplat_converter")
+        package = types.ModuleType(spec.name)
+        package.__path__ = spec.submodule_search_locations
+        sys.modules[spec.name] = package
+    from omniverse_gsplat_converter.spz_reader import read_spz
+
+    splats = read_spz(path)
+    return "omniverse-gsplat-converter", {
+        "xyz": splats.positions.reshape(-1),
+        "f_dc": splats.f_dc.reshape(-1),
+        "opacity": splats.opacities.reshape(-1),
+        "scale": splats.scales.reshape(-1),
+        "rot": splats.rotations.reshape(-1),
+        "count": len(splats.positions),
+    }
+
+
+def main():
+    rng = np.random.default_rng(404)
+    for name, (version, sh_degree, count) in FIXTURES.items():
+        path = os.path.join(DATA_DIR, name)
+        with open(path, "wb") as f:
+            f.write(gzip.compress(random_payload(version, sh_degree, count, rng), mtime=0))
+
+        try:
+            decoder, columns = decode_native(path)
+        except (OSError, RuntimeError) as e:
+            print(f"Native SPZ library unavailable ({e}), decoding with the reference reader")
+            decoder, columns = decode_reference(path)
+
+        expected = {key: np.asarray(columns[key], dtype=np.float32) for key in ply.COLUMNS}
+        np.savez(os.path.splitext(path)[0] + ".npz", count=columns["count"], decoder=decoder, **expected)
+        print(f"{name}: {count} splats, decoded with {decoder}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""quaternions_to_euler against mathutils (`pip install mathutils`), outside Blender."""
+import numpy as np
+import pytest
+
+mathutils = pytest.importorskip("mathutils")
+try:
+    mathutils.Quaternion().to_euler("XYZ")
+except (AttributeError, ValueError):
+    # Stubbed, or a build that rejects every rotation order (mathutils 3.3.0 on Python 3.11)
+    pytest.skip("mathutils can't convert rotations here", allow_module_level=True)
+
+import _blender_stub  # noqa: E402
+
+_blender_stub.install()
+from fourofour_3d_gen.util.gaussian_splatting import EULER_ORDERS, quaternions_to_euler  # noqa: E402
+
+ATOL = 1e-5
+
+
+def _quaternions(count=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    quats = rng.normal(size=(count, 4))
+    # Unnormalized, axis aligned and gimbal locked rotations besides random ones
+    quats[:8] = [
+        (1, 0, 0, 0),
+        (0, 1, 0, 0),
+        (0, 0, 1, 0),
+        (0, 0, 0, 1),
+        (3, 0, 0, 0),
+        (np.cos(np.pi / 4), 0, np.sin(np.pi / 4), 0),
+        (np.cos(np.pi / 4), 0, -np.sin(np.pi / 4), 0),
+        (0.5, 0.5, 0.5, 0.5),
+    ]
+    return quats
+
+
+def test_xyz_matches_mathutils():
+    quats = _quaternions()
+    eulers = quaternions_to_euler(quats.reshape(-1), "XYZ").reshape(-1, 3)
+    expected = np.array([mathutils.Quaternion(q).to_euler("XYZ") for q in quats])
+    np.testing.assert_allclose(eulers, expected, atol=ATOL)
+
+
+@pytest.mark.parametrize("order", sorted(EULER_ORDERS))
+def test_round_trips_to_same_rotation(order):
+    quats = _quaternions(seed=1)
+    eulers = quaternions_to_euler(quats.reshape(-1), order).reshape(-1, 3)
+    matrices = np.array([mathutils.Euler(euler, order).to_matrix() for euler in eulers])
+    expected = np.array([mathutils.Quaternion(q).normalized().to_matrix() for q in quats])
+    np.testing.assert_allclose(matrices, expected, atol=ATOL)
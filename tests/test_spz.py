@@ -0,0 +1,59 @@
+"""The built-in SPZ decoder against `read_spz`, checked-in reference decodes and, where it loads, the native libspz_shared."""
+import os
+
+import numpy as np
+import pytest
+
+import _blender_stub
+import synthetic
+
+_blender_stub.install()
+from fourofour_3d_gen.spz_loader import SPZLoader  # noqa: E402
+from fourofour_3d_gen.util import ply, spz  # noqa: E402
+
+CHUNK_SIZE = 4096
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+@pytest.fixture(scope="module")
+def data():
+    return synthetic.pack_spz(synthetic.random_splats(5000, seed=3))
+
+
+def _stream_decode(data):
+    decoder = spz.SpzStreamDecoder()
+    view = memoryview(data)
+    for start in range(0, len(data), CHUNK_SIZE):
+        decoder.feed(view[start:start + CHUNK_SIZE])
+    return decoder.finish()
+
+
+def _assert_same_columns(columns, expected, atol=0.0):
+    assert columns["count"] == expected["count"]
+    for key in ply.COLUMNS:
+        np.testing.assert_allclose(columns[key], expected[key], rtol=0.0, atol=atol, err_msg=key)
+
+
+def test_stream_decoder_matches_read_spz(data):
+    _assert_same_columns(_stream_decode(data), spz.read_spz(data))
+
+
+def test_stream_decoder_matches_native(data):
+    try:
+        loader = SPZLoader()
+    except (OSError, RuntimeError) as e:
+        pytest.skip(f"native SPZ library unavailable: {e}")
+
+    native = ply.read_custom_ply(ply.BufferReader(loader.decompress(data)))
+    _assert_same_columns(_stream_decode(data), native, atol=1e-5)
+
+
+@pytest.mark.parametrize("name", ["splats_v2", "splats_v3_sh1"])
+def test_decoders_match_fixture(name):
+    """Fixtures written and decoded once by tests/data/make_spz_fixtures.py."""
+    with open(os.path.join(DATA_DIR, f"{name}.spz"), "rb") as f:
+        data = f.read()
+    expected = np.load(os.path.join(DATA_DIR, f"{name}.npz"))
+
+    _assert_same_columns(spz.read_spz(data), expected, atol=1e-5)
+    _assert_same_columns(_stream_decode(data), expected, atol=1e-5)